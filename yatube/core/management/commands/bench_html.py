@@ -0,0 +1,72 @@
+from statistics import mean
+from time import perf_counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from core.middleware import brotli
+from posts.models import Post
+
+OWN = (
+    'core.middleware.CompressionMiddleware',
+    'core.middleware.HtmlMinifyMiddleware',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает размер и время ответа главной и страницы поста '
+        'без минификации, с ней и со сжатием.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--number', type=int, default=50,
+            help='Сколько раз запрашивать каждую страницу',
+        )
+
+    def variants(self):
+        base = [name for name in settings.MIDDLEWARE if name not in OWN]
+        full = base[:1] + list(OWN) + base[1:]
+        minify_only = base[:1] + list(OWN[1:]) + base[1:]
+        yield 'исходный', base, ''
+        yield 'минификация', minify_only, ''
+        yield 'минификация + gzip', full, 'gzip'
+        if brotli is not None:
+            yield 'минификация + br', full, 'br'
+
+    def measure(self, middleware, url, encoding, number):
+        with override_settings(MIDDLEWARE=middleware):
+            client = Client(HTTP_ACCEPT_ENCODING=encoding)
+            size = len(client.get(url).content)
+            timings = []
+            for _ in range(number):
+                started = perf_counter()
+                client.get(url)
+                timings.append(perf_counter() - started)
+        timings.sort()
+        return size, mean(timings), timings[int(len(timings) * 0.95)]
+
+    def handle(self, *args, **options):
+        post = Post.objects.first()
+        if post is None:
+            raise CommandError('Нужен хотя бы один пост')
+        urls = {
+            'index': reverse('posts:index'),
+            'post_detail': reverse('posts:post_detail', args=[post.pk]),
+        }
+        for name, url in urls.items():
+            original = None
+            for label, middleware, encoding in self.variants():
+                size, average, p95 = self.measure(
+                    middleware, url, encoding, options['number']
+                )
+                original = original or size
+                self.stdout.write(
+                    f'{name}, {label}: {size} байт '
+                    f'({size / original:.0%}), '
+                    f'среднее {average * 1000:.2f} мс, '
+                    f'p95 {p95 * 1000:.2f} мс'
+                )
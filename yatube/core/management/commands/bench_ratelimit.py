@@ -0,0 +1,32 @@
+from statistics import mean
+from time import perf_counter
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from core.ratelimit import take_token
+
+
+class Command(BaseCommand):
+    help = 'Замеряет накладные расходы одной проверки rate limit.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--number', type=int, default=10000,
+            help='Сколько проверок выполнить',
+        )
+
+    def handle(self, *args, **options):
+        key = 'ratelimit:bench:user:0'
+        timings = []
+        for _ in range(options['number']):
+            started = perf_counter()
+            take_token(key, 10 ** 9, 1)
+            timings.append(perf_counter() - started)
+        cache.delete(key)
+        timings.sort()
+        self.stdout.write(
+            f'Проверок: {len(timings)}, '
+            f'среднее {mean(timings) * 10 ** 6:.1f} мкс, '
+            f'p99 {timings[int(len(timings) * 0.99)] * 10 ** 6:.1f} мкс'
+        )
@@ -0,0 +1,123 @@
+import json
+import subprocess
+import sys
+from collections import Counter
+from statistics import median
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+BOOT = '''
+import json, resource, sys, time
+from importlib import import_module
+from wsgiref.util import setup_testing_defaults
+started = time.perf_counter()
+module, name = {wsgi!r}.rsplit('.', 1)
+application = getattr(import_module(module), name)
+from django.urls import get_resolver
+get_resolver().url_patterns
+booted = time.perf_counter()
+for url in {urls!r}:
+    environ = {{'PATH_INFO': url, 'HTTP_HOST': 'localhost'}}
+    setup_testing_defaults(environ)
+    b''.join(application(environ, lambda status, headers: None))
+print(json.dumps({{
+    'boot': booted - started,
+    'total': time.perf_counter() - started,
+    'rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    'modules': len(sys.modules),
+    'loaded': [name for name in {watch!r} if name in sys.modules],
+}}))
+'''
+
+WATCH = [
+    'PIL.Image',
+    'sorl.thumbnail.engines.pil_engine',
+    'django.contrib.admin.sites',
+    'django.contrib.auth.views',
+    'pkg_resources',
+    'setuptools',
+]
+
+
+def parse_importtime(stderr):
+    """Строки -X importtime: (собственное время, с вложенными, модуль),
+    время в микросекундах."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or '| imported package' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        rows.append((int(own), int(cumulative), name.strip()))
+    return rows
+
+
+def package(name, depth):
+    parts = name.split('.')
+    if parts[:2] == ['django', 'contrib']:
+        depth += 1
+    return '.'.join(parts[:depth])
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет холодный старт воркера: время импорта WSGI-приложения '
+        'и URLconf, память и время импорта по модулям.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='Сколько раз запускать процесс для замера времени',
+        )
+        parser.add_argument(
+            '--top', type=int, default=20,
+            help='Сколько пакетов и модулей показать',
+        )
+        parser.add_argument(
+            '--depth', type=int, default=2,
+            help='До какого уровня группировать модули по пакетам',
+        )
+        parser.add_argument(
+            '--url', action='append', default=[],
+            help='Запросить адрес после старта; можно повторять',
+        )
+
+    def run(self, urls, *flags):
+        code = BOOT.format(
+            wsgi=settings.WSGI_APPLICATION, urls=urls, watch=WATCH
+        )
+        result = subprocess.run(
+            [sys.executable, *flags, '-c', code],
+            cwd=settings.BASE_DIR, capture_output=True, text=True,
+        )
+        if result.returncode:
+            raise CommandError(result.stderr)
+        return json.loads(result.stdout.splitlines()[-1]), result.stderr
+
+    def handle(self, *args, **options):
+        runs = [self.run(options['url'])[0] for _ in range(options['repeat'])]
+        last = runs[-1]
+        self.stdout.write(
+            f'Старт: медиана {median(r["boot"] for r in runs) * 1000:.0f} мс'
+            f', с запросами {median(r["total"] for r in runs) * 1000:.0f} мс'
+            f', RSS {median(r["rss"] for r in runs) / 1024:.1f} МБ'
+            f', модулей {last["modules"]}'
+        )
+        self.stdout.write(
+            'Загружены: ' + (', '.join(last['loaded']) or 'ничего из '
+                             + ', '.join(WATCH))
+        )
+        _, stderr = self.run(options['url'], '-X', 'importtime')
+        rows = parse_importtime(stderr)
+        by_package = Counter()
+        for own, _, name in rows:
+            by_package[package(name, options['depth'])] += own
+        self.stdout.write('\nСобственное время импорта по пакетам:')
+        for name, own in by_package.most_common(options['top']):
+            self.stdout.write(f'{own / 1000:8.1f} мс  {name}')
+        self.stdout.write('\nМодули с вложенными импортами:')
+        for own, cumulative, name in sorted(
+            rows, key=lambda row: row[1], reverse=True
+        )[:options['top']]:
+            self.stdout.write(f'{cumulative / 1000:8.1f} мс  {name}')
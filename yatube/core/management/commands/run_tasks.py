@@ -0,0 +1,52 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from time import sleep
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.tasks import init_worker_process, requeue_stale, run_pending
+
+
+class Command(BaseCommand):
+    help = 'Воркер фоновой очереди задач.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.TASK_WORKERS,
+            help='Размер пула; 0 — выполнять в текущем потоке',
+        )
+        parser.add_argument(
+            '--pool', choices=('thread', 'process'), default='thread',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Разобрать готовые задачи и выйти',
+        )
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        if not workers:
+            return self.loop(None, options['once'], 1)
+        if options['pool'] == 'process':
+            connections.close_all()
+            executor = ProcessPoolExecutor(
+                workers, initializer=init_worker_process
+            )
+        else:
+            executor = ThreadPoolExecutor(workers)
+        with executor:
+            self.loop(executor, options['once'], workers)
+
+    def loop(self, executor, once, workers):
+        done = 0
+        while True:
+            requeue_stale()
+            count = run_pending(workers * 2, executor)
+            done += count
+            if count:
+                self.stdout.write(f'Выполнено задач: {done}')
+            elif once:
+                break
+            else:
+                sleep(settings.TASK_POLL_INTERVAL)
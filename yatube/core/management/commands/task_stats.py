@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from core.tasks import queue_stats
+
+
+class Command(BaseCommand):
+    help = 'Показывает глубину очереди задач и задержку их запуска.'
+
+    def handle(self, *args, **options):
+        for name, value in queue_stats().items():
+            self.stdout.write(f'{name}: {value}')
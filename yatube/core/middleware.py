@@ -0,0 +1,176 @@
+import codecs
+import re
+import zlib
+
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_string
+
+from .static import accepted_encodings
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+PRESERVED = re.compile(
+    r'<(pre|textarea|script|style)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL
+)
+OPENING = re.compile(r'<(pre|textarea|script|style)\b', re.IGNORECASE)
+INDENT = re.compile(r'\n\s+')
+COMPRESSIBLE = re.compile(
+    r'^(text/|application/(json|javascript|xml)|image/svg)'
+)
+MIN_SIZE = 200
+
+
+def preserved_blocks(html):
+    """Границы pre, textarea, script и style по порядку; у незакрытого
+    блока конец None."""
+    end = 0
+    for opening in OPENING.finditer(html):
+        if opening.start() < end:
+            continue
+        block = PRESERVED.match(html, opening.start())
+        if block is None:
+            yield opening.start(), None
+            return
+        end = block.end()
+        yield opening.start(), end
+
+
+def minify(html):
+    """Схлопывает перевод строки с отступом после него в один перевод.
+
+    Для браузера любая серия пробелов вне <pre> и <textarea> значит
+    то же, что один пробел, поэтому разметка не меняется; содержимое
+    pre, textarea, script и style не трогается.
+    """
+    parts = []
+    start = 0
+    for block_start, block_end in preserved_blocks(html):
+        parts.append(INDENT.sub('\n', html[start:block_start]))
+        parts.append(html[block_start:block_end])
+        start = len(html) if block_end is None else block_end
+    parts.append(INDENT.sub('\n', html[start:]))
+    return ''.join(parts)
+
+
+def safe_cut(html):
+    """Длина начала html, которое можно минифицировать отдельно от
+    продолжения: без незакрытого защищённого блока, недописанного тега
+    и пробелов в конце, которые могут продолжиться в следующем куске."""
+    closed = 0
+    cut = len(html)
+    for block_start, block_end in preserved_blocks(html):
+        if block_end is None:
+            cut = block_start
+        else:
+            closed = block_end
+    tag = html.rfind('<', closed, cut)
+    if tag != -1 and html.find('>', tag, cut) == -1:
+        cut = tag
+    return len(html[:cut].rstrip())
+
+
+def minify_stream(chunks, charset):
+    decoder = codecs.getincrementaldecoder(charset)('replace')
+    pending = ''
+    for chunk in chunks:
+        pending += decoder.decode(chunk)
+        cut = safe_cut(pending)
+        if cut:
+            yield minify(pending[:cut]).encode(charset)
+            pending = pending[cut:]
+    pending += decoder.decode(b'', final=True)
+    if pending:
+        yield minify(pending).encode(charset)
+
+
+def gzip_stream(chunks):
+    """gzip с Z_SYNC_FLUSH после каждого куска: клиент получает начало
+    страницы сразу, а не когда наберётся буфер zlib."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush(
+            zlib.Z_SYNC_FLUSH
+        )
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def brotli_stream(chunks):
+    compressor = brotli.Compressor(quality=5)
+    for chunk in chunks:
+        data = compressor.process(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+def negotiate(accept_encoding):
+    encodings = accepted_encodings(accept_encoding)
+    if brotli is not None and 'br' in encodings:
+        return 'br'
+    if 'gzip' in encodings:
+        return 'gzip'
+    return None
+
+
+class HtmlMinifyMiddleware(MiddlewareMixin):
+    """Убирает отступы шаблонов из text/html, в том числе у потоковых
+    ответов — кусками, не разрывая защищённые блоки."""
+
+    def process_response(self, request, response):
+        if (response.has_header('Content-Encoding')
+                or not response.get('Content-Type', '').startswith(
+                    'text/html')):
+            return response
+        if response.streaming:
+            response.streaming_content = minify_stream(
+                response.streaming_content, response.charset
+            )
+            del response['Content-Length']
+            return response
+        response.content = minify(
+            response.content.decode(response.charset)
+        ).encode(response.charset)
+        if response.has_header('Content-Length'):
+            response['Content-Length'] = str(len(response.content))
+        return response
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """GZipMiddleware с brotli, когда он установлен и клиент его
+    принимает, и со сбросом буфера после каждого куска потокового
+    ответа. Сжимаются только текстовые типы."""
+
+    def process_response(self, request, response):
+        if not response.streaming and len(response.content) < MIN_SIZE:
+            return response
+        if (response.has_header('Content-Encoding')
+                or not COMPRESSIBLE.match(response.get('Content-Type', ''))):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+        if response.streaming:
+            stream = brotli_stream if encoding == 'br' else gzip_stream
+            response.streaming_content = stream(response.streaming_content)
+            del response['Content-Length']
+        else:
+            compressed = (
+                brotli.compress(response.content, quality=5)
+                if encoding == 'br' else compress_string(response.content)
+            )
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(response.content))
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
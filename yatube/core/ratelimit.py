@@ -0,0 +1,74 @@
+from functools import wraps
+from math import ceil
+from time import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .views import too_many_requests
+
+
+def window_key(key, period, now):
+    return f'{key}:{int(now // period)}'
+
+
+def take_token(key, limit, period):
+    """Счётчик фиксированного окна в кеше: не больше limit запросов
+    за period секунд. Возвращает 0, если запрос пропущен, иначе сколько
+    секунд ждать следующего окна.
+
+    cache.add и cache.incr атомарны, поэтому параллельные запросы
+    не прочитают одно и то же значение. Лимит общий для всех воркеров
+    только с общим кешем (memcached, redis); LocMemCache считает
+    запросы в каждом процессе отдельно.
+    """
+    now = time()
+    window = window_key(key, period, now)
+    if cache.add(window, 1, period):
+        return 0
+    try:
+        count = cache.incr(window)
+    except ValueError:
+        # Окно истекло между add и incr.
+        cache.add(window, 1, period)
+        return 0
+    if count > limit:
+        return period - now % period
+    return 0
+
+
+def return_token(key, period):
+    """Возвращает токен, взятый take_token в текущем окне."""
+    try:
+        cache.decr(window_key(key, period, time()))
+    except ValueError:
+        pass
+
+
+def ratelimit(scope, methods=('POST',)):
+    """Ограничивает частоту запросов view по пользователю и по IP;
+    лимиты берутся из settings.RATELIMITS[scope]."""
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if settings.RATELIMIT_ENABLED and request.method in methods:
+                limits = settings.RATELIMITS[scope]
+                buckets = [('ip', request.META.get('REMOTE_ADDR'))]
+                if request.user.is_authenticated:
+                    buckets.insert(0, ('user', request.user.pk))
+                taken = []
+                for kind, ident in buckets:
+                    if kind not in limits:
+                        continue
+                    key = f'ratelimit:{scope}:{kind}:{ident}'
+                    limit, period = limits[kind]
+                    wait = take_token(key, limit, period)
+                    if wait:
+                        # Запрос отклонён: токены уже пройденных лимитов возвращаются.
+                        for taken_key, taken_period in taken:
+                            return_token(taken_key, taken_period)
+                        return too_many_requests(request, ceil(wait))
+                    taken.append((key, period))
+            return view(request, *args, **kwargs)
+        return wrapped
+    return decorator
@@ -0,0 +1,127 @@
+import mimetypes
+import os
+import re
+from collections import namedtuple
+from wsgiref.util import FileWrapper
+
+from django.conf import settings
+
+HASHED = re.compile(r'\.[0-9a-f]{12}\.\w+$')
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+Variant = namedtuple('Variant', 'path size etag encoding')
+
+
+def accepted_encodings(header):
+    """Кодировки из Accept-Encoding, кроме явно запрещённых q=0."""
+    encodings = set()
+    for part in header.split(','):
+        name, _, params = part.partition(';')
+        quality = params.strip().replace(' ', '')
+        if quality in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        encodings.add(name.strip().lower())
+    return encodings
+
+
+class StaticFile:
+    def __init__(self, name, path):
+        self.content_type = (
+            mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        )
+        if self.content_type.startswith('text/'):
+            self.content_type += '; charset=utf-8'
+        if HASHED.search(name):
+            self.cache_control = (
+                f'public, max-age={settings.STATIC_MAX_AGE}, immutable'
+            )
+        else:
+            self.cache_control = 'public, max-age=60'
+        self.variants = [
+            self.variant(path + suffix, encoding)
+            for encoding, suffix in ENCODINGS
+            if os.path.isfile(path + suffix)
+        ]
+        self.variants.append(self.variant(path, None))
+
+    @staticmethod
+    def variant(path, encoding):
+        stat = os.stat(path)
+        etag = f'"{int(stat.st_mtime):x}-{stat.st_size:x}"'
+        return Variant(path, stat.st_size, etag, encoding)
+
+    def pick(self, accept_encoding):
+        encodings = accepted_encodings(accept_encoding)
+        for variant in self.variants:
+            if variant.encoding is None or variant.encoding in encodings:
+                return variant
+
+    def headers(self, variant):
+        headers = [
+            ('Content-Type', self.content_type),
+            ('Content-Length', str(variant.size)),
+            ('Cache-Control', self.cache_control),
+            ('ETag', variant.etag),
+        ]
+        if len(self.variants) > 1:
+            headers.append(('Vary', 'Accept-Encoding'))
+        if variant.encoding:
+            headers.append(('Content-Encoding', variant.encoding))
+        return headers
+
+
+class StaticFiles:
+    """WSGI-обёртка, которая отдаёт STATIC_ROOT раньше Django.
+
+    Содержимое STATIC_ROOT читается один раз при старте процесса, так что
+    отдаются только собранные collectstatic файлы, а на запрос не
+    приходится ни одного stat. Файлы с хешем в имени кешируются браузером
+    на STATIC_MAX_AGE без перепроверки; если клиент принимает br или gzip
+    и рядом лежит сжатая копия, отдаётся она.
+    """
+
+    def __init__(self, application, root=None, prefix=None):
+        self.application = application
+        self.prefix = prefix or settings.STATIC_URL
+        self.files = self.scan(root or settings.STATIC_ROOT)
+
+    @staticmethod
+    def scan(root):
+        files = {}
+        for directory, _, names in os.walk(root):
+            for name in names:
+                path = os.path.join(directory, name)
+                base, suffix = os.path.splitext(path)
+                if suffix in ('.br', '.gz') and os.path.isfile(base):
+                    continue
+                url = os.path.relpath(path, root).replace(os.sep, '/')
+                files[url] = StaticFile(name, path)
+        return files
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        static = (
+            self.files.get(path[len(self.prefix):])
+            if path.startswith(self.prefix) else None
+        )
+        if static is None:
+            return self.application(environ, start_response)
+        method = environ['REQUEST_METHOD']
+        if method not in ('GET', 'HEAD'):
+            start_response(
+                '405 Method Not Allowed', [('Allow', 'GET, HEAD')]
+            )
+            return []
+        variant = static.pick(environ.get('HTTP_ACCEPT_ENCODING', ''))
+        headers = static.headers(variant)
+        if environ.get('HTTP_IF_NONE_MATCH') == variant.etag:
+            start_response('304 Not Modified', [
+                header for header in headers
+                if header[0] in ('Cache-Control', 'ETag', 'Vary')
+            ])
+            return []
+        start_response('200 OK', headers)
+        if method == 'HEAD':
+            return []
+        wrapper = environ.get('wsgi.file_wrapper', FileWrapper)
+        return wrapper(open(variant.path, 'rb'), 8192)
@@ -0,0 +1,104 @@
+import gzip
+import os
+from urllib.parse import urljoin
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+from django.core.files.storage import Storage
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.encoding import filepath_to_uri
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = (
+    '.css', '.js', '.svg', '.html', '.txt', '.json', '.xml', '.ico',
+    '.map', '.ttf', '.eot', '.otf',
+)
+
+
+def compressors():
+    yield '.gz', lambda data: gzip.compress(data, 9, mtime=0)
+    if brotli is not None:
+        yield '.br', brotli.compress
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Манифест с хешами в именах, плюс рядом с каждым текстовым файлом
+    лежат .gz и, если установлен brotli, .br — их отдаёт
+    core.static.StaticFiles без сжатия на каждом запросе."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for hashed_name in set(self.hashed_files.values()):
+            for compressed in self.compress(hashed_name):
+                yield hashed_name, compressed, True
+
+    def compress(self, name):
+        if not name.lower().endswith(COMPRESSIBLE):
+            return
+        path = self.path(name)
+        with open(path, 'rb') as source:
+            data = source.read()
+        for suffix, compress in compressors():
+            packed = compress(data)
+            # Выигрыш меньше 5% не стоит лишнего файла.
+            if len(packed) < len(data) * 0.95:
+                with open(path + suffix, 'wb') as target:
+                    target.write(packed)
+                yield name + suffix
+            elif os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+class InMemoryStorage(Storage):
+    """Хранилище медиафайлов в словаре процесса для тестов: загрузки
+    не пишутся на диск. Смена MEDIA_ROOT через override_settings
+    очищает его, как временный каталог медиа."""
+
+    files = {}
+
+    def _open(self, name, mode='rb'):
+        return ContentFile(self.files[name], name=name)
+
+    def _save(self, name, content):
+        content.seek(0)
+        data = content.read()
+        self.files[name] = data.encode() if isinstance(data, str) else data
+        return name
+
+    def delete(self, name):
+        self.files.pop(name, None)
+
+    def exists(self, name):
+        return name in self.files
+
+    def size(self, name):
+        return len(self.files[name])
+
+    def listdir(self, path):
+        prefix = path.rstrip('/') + '/' if path else ''
+        directories, files = set(), []
+        for name in self.files:
+            if name.startswith(prefix):
+                head, _, tail = name[len(prefix):].partition('/')
+                if tail:
+                    directories.add(head)
+                else:
+                    files.append(head)
+        return sorted(directories), sorted(files)
+
+    def url(self, name):
+        return urljoin(settings.MEDIA_URL, filepath_to_uri(name))
+
+
+@receiver(setting_changed)
+def clear_in_memory_storage(setting, **kwargs):
+    if setting == 'MEDIA_ROOT':
+        InMemoryStorage.files.clear()
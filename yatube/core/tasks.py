@@ -0,0 +1,123 @@
+import json
+import logging
+import traceback
+from datetime import timedelta
+from functools import partial
+from importlib import import_module
+from statistics import mean
+
+import django
+from django.conf import settings
+from django.db import connections
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+def task(func):
+    """Регистрирует функцию как задачу и добавляет ей func.delay()."""
+    name = f'{func.__module__}.{func.__name__}'
+    _registry[name] = func
+    func.delay = partial(enqueue, name)
+    return func
+
+
+def enqueue(name, *args, **kwargs):
+    return Task.objects.create(
+        name=name, payload=json.dumps({'args': args, 'kwargs': kwargs})
+    )
+
+
+def resolve(name):
+    if name not in _registry:
+        import_module(name.rpartition('.')[0])
+    return _registry[name]
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=settings.TASK_RETRY_DELAY * 2 ** (attempts - 1))
+
+
+def requeue_stale():
+    """Возвращает в очередь задачи упавших воркеров."""
+    deadline = timezone.now() - timedelta(seconds=settings.TASK_TIMEOUT)
+    return Task.objects.filter(
+        status=Task.RUNNING, started_at__lt=deadline
+    ).update(status=Task.PENDING)
+
+
+def claim(limit):
+    """Забирает до limit готовых задач; UPDATE с условием по статусу
+    не даёт двум воркерам взять одну и ту же задачу."""
+    now = timezone.now()
+    ready = Task.objects.filter(
+        status=Task.PENDING, run_at__lte=now
+    ).values_list('pk', flat=True)[:limit]
+    return [
+        pk for pk in list(ready)
+        if Task.objects.filter(pk=pk, status=Task.PENDING).update(
+            status=Task.RUNNING, started_at=now, attempts=F('attempts') + 1
+        )
+    ]
+
+
+def execute(pk):
+    job = Task.objects.get(pk=pk)
+    payload = json.loads(job.payload)
+    try:
+        resolve(job.name)(*payload['args'], **payload['kwargs'])
+    except Exception:
+        job.last_error = traceback.format_exc()
+        if job.attempts >= settings.TASK_MAX_ATTEMPTS:
+            job.status = Task.FAILED
+            job.finished_at = timezone.now()
+        else:
+            job.status = Task.PENDING
+            job.run_at = timezone.now() + retry_delay(job.attempts)
+        logger.exception('Задача %s #%s упала', job.name, job.pk)
+    else:
+        job.status = Task.DONE
+        job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'run_at', 'finished_at', 'last_error'])
+    return job.status
+
+
+def run_pending(limit, executor=None):
+    """Выполняет готовые задачи в executor или, без него, по очереди."""
+    pks = claim(limit)
+    if executor is None:
+        for pk in pks:
+            execute(pk)
+    else:
+        list(executor.map(execute, pks))
+    return len(pks)
+
+
+def init_worker_process():
+    django.setup()
+    connections.close_all()
+
+
+def queue_stats():
+    """Глубина очереди и задержка запуска задач в секундах."""
+    now = timezone.now()
+    counts = dict.fromkeys(dict(Task.STATUSES), 0)
+    for status in counts:
+        counts[status] = Task.objects.filter(status=status).count()
+    oldest = Task.objects.filter(
+        status=Task.PENDING, run_at__lte=now
+    ).values_list('run_at', flat=True).first()
+    recent = Task.objects.filter(
+        status=Task.DONE, finished_at__gte=now - timedelta(hours=1)
+    ).values_list('run_at', 'started_at')[:settings.BULK_BATCH_SIZE]
+    waits = [(started - run_at).total_seconds() for run_at, started in recent]
+    return {
+        **counts,
+        'oldest_pending_age': (now - oldest).total_seconds() if oldest else 0,
+        'avg_latency': mean(waits) if waits else 0,
+    }
@@ -1,6 +1,39 @@
+import gzip
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from http import HTTPStatus
+from unittest import mock
 
-from django.test import TestCase, Client
+from django.contrib.auth import get_user_model
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .management.commands.profile_startup import package, parse_importtime
+from .middleware import gzip_stream, minify, minify_stream
+from .models import Task
+from .ratelimit import take_token, window_key
+from .static import StaticFiles
+from .tasks import queue_stats, run_pending, task
+
+User = get_user_model()
+
+calls = []
+
+
+@task
+def remember(value, suffix=''):
+    calls.append(f'{value}{suffix}')
+
+
+@task
+def explode():
+    raise ValueError('Сбой')
 
 
 class ViewTestClass(TestCase):
@@ -11,3 +44,298 @@ class ViewTestClass(TestCase):
         response = self.guest_client.get('/nonexist-page/')
         self.assertTemplateUsed(response, 'core/404.html')
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+
+@override_settings(TASK_MAX_ATTEMPTS=2, TASK_RETRY_DELAY=60)
+class TaskQueueTest(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_task_runs_once(self):
+        """Задача выполняется воркером один раз."""
+        job = remember.delay('готово', suffix='!')
+        self.assertEqual(queue_stats()['pending'], 1)
+        self.assertEqual(run_pending(10), 1)
+        self.assertEqual(run_pending(10), 0)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Task.DONE)
+        self.assertEqual(calls, ['готово!'])
+
+    def test_failed_task_retries_with_backoff(self):
+        """Упавшая задача откладывается, а после лимита попыток падает."""
+        job = explode.delay()
+        with self.assertLogs('core.tasks', level='ERROR'):
+            run_pending(10)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Task.PENDING)
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn('Сбой', job.last_error)
+        self.assertEqual(run_pending(10), 0)
+        Task.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        with self.assertLogs('core.tasks', level='ERROR'):
+            run_pending(10)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Task.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+
+@override_settings(RATELIMIT_ENABLED=True, RATELIMITS={
+    'post_create': {'user': (2, 60), 'ip': (3, 60)},
+    'add_comment': {'user': (2, 60)},
+    'signup': {'ip': (1, 60)},
+})
+class RateLimitTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='writer')
+        cls.other = User.objects.create_user(username='other')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+        # Окно не должно смениться посреди теста.
+        clock = mock.patch('core.ratelimit.time', return_value=1000)
+        clock.start()
+        self.addCleanup(clock.stop)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_window_resets(self):
+        """В новом окне счётчик начинается заново."""
+        with mock.patch('core.ratelimit.time', return_value=1000):
+            self.assertEqual(take_token('bucket', 2, 60), 0)
+            self.assertEqual(take_token('bucket', 2, 60), 0)
+            self.assertEqual(take_token('bucket', 2, 60), 20)
+        with mock.patch('core.ratelimit.time', return_value=1030):
+            self.assertEqual(take_token('bucket', 2, 60), 0)
+
+    def test_parallel_requests_share_limit(self):
+        """Параллельные запросы не проходят сверх лимита."""
+        with ThreadPoolExecutor(8) as executor:
+            waits = list(executor.map(
+                lambda _: take_token('burst', 5, 60), range(40)
+            ))
+        self.assertEqual(waits.count(0), 5)
+
+    def test_user_limit(self):
+        """Сверх лимита пользователя запись отклоняется с 429."""
+        url = reverse('posts:post_create')
+        for _ in range(2):
+            response = self.client.post(url, {'text': 'Пост'})
+            self.assertEqual(response.status_code, HTTPStatus.FOUND)
+        response = self.client.post(url, {'text': 'Пост'})
+        self.assertEqual(response.status_code, HTTPStatus.TOO_MANY_REQUESTS)
+        self.assertTemplateUsed(response, 'core/429.html')
+        self.assertIn('Retry-After', response)
+        self.assertEqual(self.client.get(url).status_code, HTTPStatus.OK)
+
+    def test_ip_limit(self):
+        """Лимит по IP общий для всех пользователей с одного адреса."""
+        url = reverse('posts:post_create')
+        self.client.post(url, {'text': 'Пост'})
+        self.client.post(url, {'text': 'Пост'})
+        self.client.force_login(self.other)
+        response = self.client.post(url, {'text': 'Пост'})
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+        response = self.client.post(url, {'text': 'Пост'})
+        self.assertEqual(response.status_code, HTTPStatus.TOO_MANY_REQUESTS)
+
+    def test_ip_rejection_returns_user_token(self):
+        """Отказ по IP не тратит токен пользователя."""
+        url = reverse('posts:post_create')
+        with override_settings(RATELIMITS={
+            'post_create': {'user': (2, 60), 'ip': (1, 60)},
+        }):
+            self.client.post(url, {'text': 'Пост'})
+            self.client.force_login(self.other)
+            response = self.client.post(url, {'text': 'Пост'})
+        self.assertEqual(response.status_code, HTTPStatus.TOO_MANY_REQUESTS)
+        key = f'ratelimit:post_create:user:{self.other.pk}'
+        self.assertEqual(cache.get(window_key(key, 60, 1000)), 0)
+
+    def test_signup_limit(self):
+        """Регистрация ограничена по IP."""
+        self.client.logout()
+        url = reverse('users:signup')
+        self.client.post(url, {})
+        response = self.client.post(url, {})
+        self.assertEqual(response.status_code, HTTPStatus.TOO_MANY_REQUESTS)
+
+    @override_settings(RATELIMIT_ENABLED=False)
+    def test_disabled(self):
+        url = reverse('posts:post_create')
+        for _ in range(3):
+            response = self.client.post(url, {'text': 'Пост'})
+            self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+
+class StaticFilesTest(TestCase):
+    CSS = b'body { margin: 0; }\n' * 200
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.source = tempfile.mkdtemp()
+        cls.root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(cls.source, 'css'))
+        with open(os.path.join(cls.source, 'css', 'site.css'), 'wb') as css:
+            css.write(cls.CSS)
+        with open(os.path.join(cls.source, 'logo.png'), 'wb') as logo:
+            logo.write(os.urandom(512))
+        cls.settings = override_settings(
+            STATICFILES_DIRS=(cls.source,),
+            STATIC_ROOT=cls.root,
+            STATICFILES_FINDERS=(
+                'django.contrib.staticfiles.finders.FileSystemFinder',
+            ),
+            STATICFILES_STORAGE=(
+                'core.storage.CompressedManifestStaticFilesStorage'
+            ),
+        )
+        cls.settings.enable()
+        call_command('collectstatic', interactive=False, verbosity=0)
+        cls.css = staticfiles_storage.stored_name('css/site.css')
+        cls.logo = staticfiles_storage.stored_name('logo.png')
+        cls.app = StaticFiles(cls.fallback, root=cls.root)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings.disable()
+        shutil.rmtree(cls.source)
+        shutil.rmtree(cls.root)
+        super().tearDownClass()
+
+    @staticmethod
+    def fallback(environ, start_response):
+        start_response('404 Not Found', [])
+        return [b'django']
+
+    def get(self, path, **environ):
+        response = {}
+
+        def start_response(status, headers):
+            response.update(status=status, headers=dict(headers))
+
+        environ.setdefault('REQUEST_METHOD', 'GET')
+        chunks = self.app(dict(environ, PATH_INFO=path), start_response)
+        body = b''.join(chunks)
+        if hasattr(chunks, 'close'):
+            chunks.close()
+        return response['status'], response['headers'], body
+
+    def test_collectstatic_writes_compressed_copies(self):
+        """collectstatic кладёт .gz рядом с текстовыми файлами."""
+        self.assertNotEqual(self.css, 'css/site.css')
+        self.assertTrue(os.path.exists(
+            os.path.join(self.root, self.css + '.gz')
+        ))
+        self.assertFalse(os.path.exists(
+            os.path.join(self.root, self.logo + '.gz')
+        ))
+
+    def test_serves_gzip_when_accepted(self):
+        status, headers, body = self.get(
+            f'/static/{self.css}', HTTP_ACCEPT_ENCODING='gzip, deflate'
+        )
+        self.assertEqual(status, '200 OK')
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        self.assertEqual(headers['Vary'], 'Accept-Encoding')
+        self.assertIn('immutable', headers['Cache-Control'])
+        self.assertEqual(gzip.decompress(body), self.CSS)
+
+    def test_serves_plain_file(self):
+        for accept in ('', 'gzip;q=0'):
+            status, headers, body = self.get(
+                f'/static/{self.css}', HTTP_ACCEPT_ENCODING=accept
+            )
+            self.assertNotIn('Content-Encoding', headers)
+            self.assertEqual(body, self.CSS)
+
+    def test_unhashed_name_is_not_immutable(self):
+        status, headers, body = self.get('/static/logo.png')
+        self.assertEqual(headers['Content-Type'], 'image/png')
+        self.assertEqual(headers['Cache-Control'], 'public, max-age=60')
+
+    def test_not_modified(self):
+        _, headers, _ = self.get(f'/static/{self.logo}')
+        status, _, body = self.get(
+            f'/static/{self.logo}', HTTP_IF_NONE_MATCH=headers['ETag']
+        )
+        self.assertEqual(status, '304 Not Modified')
+        self.assertEqual(body, b'')
+
+    def test_unknown_path_goes_to_django(self):
+        for path in ('/static/missing.css', '/static/../settings.py', '/'):
+            status, _, body = self.get(path)
+            self.assertEqual(body, b'django')
+
+
+class HtmlMiddlewareTest(TestCase):
+    HTML = (
+        '<div>\n    <p>Привет,\n      мир</p>\n'
+        '    <pre>  код\n      с отступом</pre>\n'
+        '    <textarea>\n  текст</textarea>\n'
+        '    <script>\n  var a;\n</script>\n</div>\n'
+    )
+
+    def test_minify_keeps_preformatted_blocks(self):
+        self.assertEqual(
+            minify(self.HTML),
+            '<div>\n<p>Привет,\nмир</p>\n'
+            '<pre>  код\n      с отступом</pre>\n'
+            '<textarea>\n  текст</textarea>\n'
+            '<script>\n  var a;\n</script>\n</div>\n'
+        )
+
+    def test_stream_matches_whole_document(self):
+        """Результат не зависит от того, где поток разрезан на куски."""
+        data = self.HTML.encode()
+        for size in (1, 3, 7, 16):
+            chunks = [
+                data[start:start + size]
+                for start in range(0, len(data), size)
+            ]
+            self.assertEqual(
+                b''.join(minify_stream(chunks, 'utf-8')).decode(),
+                minify(self.HTML)
+            )
+
+    def test_gzip_stream_flushes_every_chunk(self):
+        chunks = [b'<p>%d</p>' % number for number in range(10)]
+        compressed = list(gzip_stream(chunks))
+        self.assertGreaterEqual(len(compressed), len(chunks))
+        self.assertEqual(gzip.decompress(b''.join(compressed)),
+                         b''.join(chunks))
+
+    def test_page_is_minified_and_compressed(self):
+        url = reverse('posts:index')
+        response = self.client.get(url)
+        self.assertNotIn(b'\n  ', response.content)
+        self.assertNotIn('Content-Encoding', response)
+        self.assertIn('Accept-Encoding', response['Vary'])
+        compressed = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertEqual(
+            gzip.decompress(compressed.content), response.content
+        )
+
+
+class ProfileStartupTest(TestCase):
+    def test_parse_importtime(self):
+        stderr = (
+            'import time: self [us] | cumulative | imported package\n'
+            'import time:       120 |        120 |     django.utils.version\n'
+            'import time:      3000 |       3120 |   '
+            'django.contrib.admin.sites\n'
+            'ошибка\n'
+        )
+        rows = parse_importtime(stderr)
+        self.assertEqual(rows, [
+            (120, 120, 'django.utils.version'),
+            (3000, 3120, 'django.contrib.admin.sites'),
+        ])
+        self.assertEqual(
+            [package(name, 2) for _, _, name in rows],
+            ['django.utils', 'django.contrib.admin']
+        )
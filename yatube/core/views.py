@@ -1,5 +1,6 @@
 from http import HTTPStatus
 
+from django.http import JsonResponse
 from django.shortcuts import render
 
 
@@ -23,3 +24,20 @@ def internal_server_error(request):
         {'path': request.path},
         status=HTTPStatus.INTERNAL_SERVER_ERROR
     )
+
+
+def too_many_requests(request, retry_after):
+    if request.is_ajax():
+        response = JsonResponse(
+            {'errors': {'__all__': ['Слишком много запросов']}},
+            status=HTTPStatus.TOO_MANY_REQUESTS
+        )
+    else:
+        response = render(
+            request,
+            'core/429.html',
+            {'retry_after': retry_after},
+            status=HTTPStatus.TOO_MANY_REQUESTS
+        )
+    response['Retry-After'] = retry_after
+    return response
@@ -1,41 +1,159 @@
-from django.contrib import admin
+from django.conf import settings
+from django.contrib import admin, messages
+from django.core.exceptions import ValidationError
 
+from .forms import ModerationActionForm
 from .models import Group, Post, Comment, Follow
+from .moderation import ACTIONS, chunked
+from .page_separation import EstimatedCountPaginator
+from .tasks import moderate
 
 
-class PostAdmin(admin.ModelAdmin):
+class ModerationMixin:
+    """Пакетные действия модерации вместо стандартного удаления.
+
+    Выборки больше MODERATION_SYNC_LIMIT обрабатываются в фоне,
+    по задаче на каждые BULK_BATCH_SIZE объектов.
+    """
+    action_form = ModerationActionForm
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+
+    def moderate(self, request, action, ids, *args):
+        ids = list(ids)
+        if len(ids) > settings.MODERATION_SYNC_LIMIT:
+            for chunk in chunked(ids):
+                moderate.delay(action, chunk, *args)
+            self.message_user(
+                request, f'Обработка {len(ids)} объектов поставлена в очередь'
+            )
+            return
+        result = ACTIONS[action](ids, *args)
+        if isinstance(result, dict):
+            result = ', '.join(
+                f'{name}: {count}' for name, count in result.items()
+            )
+        self.message_user(request, f'Готово, обработано — {result}')
+
+    def delete_authors_content(self, request, queryset):
+        author_ids = queryset.order_by().values_list(
+            'author_id', flat=True
+        ).distinct()
+        self.moderate(request, 'delete_user_content', author_ids)
+    delete_authors_content.allowed_permissions = ('delete',)
+    delete_authors_content.short_description = (
+        'Удалить всё содержимое авторов выбранных записей'
+    )
+
+
+class TextSearchFilter(admin.SimpleListFilter):
+    """Включает поиск по тексту постов. По умолчанию поиск идёт только
+    по индексированному имени автора: LIKE по тексту — полный просмотр
+    таблицы."""
+    title = 'поиск'
+    parameter_name = 'in_text'
+
+    def lookups(self, request, model_admin):
+        return (('1', 'и по тексту'),)
+
+    def queryset(self, request, queryset):
+        return queryset
+
+
+class PostAdmin(ModerationMixin, admin.ModelAdmin):
     list_display = ('pk', 'text', 'pub_date', 'author', 'group',)
     list_editable = ('group',)
-    search_fields = ('text',)
-    list_filter = ('pub_date',)
+    actions = ('delete_posts', 'reassign_group', 'delete_authors_content')
+    list_select_related = ('author', 'group')
+    search_fields = ('text', '=author__username')
+    list_filter = (TextSearchFilter, 'pub_date')
+    autocomplete_fields = ('author',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     empty_value_display = '-пусто-'
 
+    def get_search_fields(self, request):
+        if request.GET.get(TextSearchFilter.parameter_name) == '1':
+            return self.search_fields
+        return tuple(
+            field for field in self.search_fields if field != 'text'
+        )
+
+    def get_changelist_formset(self, request, **kwargs):
+        """Список групп для list_editable выбирается один раз,
+        а не отдельным запросом в каждой строке."""
+        formset = super().get_changelist_formset(request, **kwargs)
+        group_field = formset.form.base_fields['group']
+        group_field.choices = list(group_field.choices)
+        return formset
+
+    def delete_posts(self, request, queryset):
+        self.moderate(
+            request, 'delete_posts', queryset.values_list('pk', flat=True)
+        )
+    delete_posts.allowed_permissions = ('delete',)
+    delete_posts.short_description = 'Удалить выбранные посты'
+
+    def reassign_group(self, request, queryset):
+        try:
+            group = self.action_form.base_fields['group'].clean(
+                request.POST.get('group')
+            )
+        except ValidationError:
+            self.message_user(request, 'Группа не найдена', messages.ERROR)
+            return
+        self.moderate(
+            request, 'reassign_group',
+            queryset.values_list('pk', flat=True), group and group.pk
+        )
+    reassign_group.allowed_permissions = ('change',)
+    reassign_group.short_description = 'Перенести в выбранную группу'
+
 
 class GroupAdmin(admin.ModelAdmin):
     list_display = ('title', 'slug', 'description')
-    search_fields = ('description',)
+    search_fields = ('title', '=slug', 'description')
     empty_value_display = '-пусто-'
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(ModerationMixin, admin.ModelAdmin):
     list_display = (
         'post',
         'author',
         'text',
         'pub_date',
     )
-    search_fields = ('author',)
+    list_select_related = ('post', 'author')
+    search_fields = ('=author__username',)
     list_filter = ('pub_date',)
+    autocomplete_fields = ('author',)
+    raw_id_fields = ('post',)
+    actions = ('delete_comments', 'delete_authors_content')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     empty_value_display = '-пусто-'
 
+    def delete_comments(self, request, queryset):
+        self.moderate(
+            request, 'delete_comments', queryset.values_list('pk', flat=True)
+        )
+    delete_comments.allowed_permissions = ('delete',)
+    delete_comments.short_description = 'Удалить выбранные комментарии'
+
 
 class FollowAdmin(admin.ModelAdmin):
     list_display = (
         'user',
         'author'
     )
-    search_fields = ('author', 'user')
-    list_filter = ('user', 'author')
+    list_select_related = ('user', 'author')
+    search_fields = ('=author__username', '=user__username')
+    autocomplete_fields = ('user', 'author')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     empty_value_display = '-пусто-'
 
 
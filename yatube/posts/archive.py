@@ -0,0 +1,58 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ArchivedComment, ArchivedPost, Comment, Post
+from .moderation import drain
+
+
+def archive_candidates(cutoff):
+    """Посты старше cutoff, у которых нет комментариев новее cutoff.
+    Живые обсуждения остаются в горячей таблице целиком."""
+    return Post.objects.filter(pub_date__lt=cutoff).filter(
+        Q(last_comment_at__isnull=True) | Q(last_comment_at__lt=cutoff)
+    )
+
+
+def _archive_posts(chunk):
+    ArchivedPost.objects.bulk_create(
+        ArchivedPost(
+            id=post.pk,
+            text=post.text,
+            pub_date=post.pub_date,
+            author_id=post.author_id,
+            group_id=post.group_id,
+            image=post.image.name,
+            comment_count=post.comment_count,
+            last_comment_at=post.last_comment_at,
+        )
+        for post in Post.objects.filter(pk__in=chunk)
+    )
+    comments = Comment.objects.filter(post_id__in=chunk)
+    ArchivedComment.objects.bulk_create(
+        (
+            ArchivedComment(
+                id=comment.pk,
+                post_id=comment.post_id,
+                author_id=comment.author_id,
+                text=comment.text,
+                pub_date=comment.pub_date,
+            )
+            for comment in comments.iterator()
+        ),
+        batch_size=settings.BULK_BATCH_SIZE,
+    )
+    comments._raw_delete(comments.db)
+    Post.objects.filter(pk__in=chunk).delete()
+
+
+def archive_content(days=None):
+    """Переносит неактивные посты старше days дней вместе
+    с комментариями в архивные таблицы. Возвращает число постов."""
+    days = settings.ARCHIVE_AFTER_DAYS if days is None else days
+    cutoff = timezone.now() - timedelta(days=days)
+    return drain(
+        archive_candidates(cutoff), _archive_posts, 'Архивация постов'
+    )
@@ -0,0 +1,257 @@
+import fcntl
+import glob
+import json
+import logging
+import os
+from time import time
+from uuid import uuid4
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core.models import Task
+from core.tasks import enqueue as enqueue_task
+from .models import Comment, Post, User
+
+logger = logging.getLogger(__name__)
+
+SESSION_KEY = 'pending_comments'
+FLUSH_TASK = 'posts.tasks.flush_comment_buffer'
+
+_state = {'count': 0, 'first': None}
+
+
+def journal_path():
+    return os.path.join(settings.COMMENT_BUFFER_DIR, f'{os.getpid()}.ndjson')
+
+
+def _same_file(handle, path):
+    try:
+        return os.fstat(handle.fileno()).st_ino == os.stat(path).st_ino
+    except FileNotFoundError:
+        return False
+
+
+def _append(path, line):
+    """Дописывает строку под блокировкой. Если журнал успели
+    переименовать, пока ждали блокировку, открывает новый.
+
+    Без COMMENT_BUFFER_FSYNC записанное переживает падение процесса,
+    но не отключение питания."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    while True:
+        with open(path, 'a', encoding='utf-8') as journal:
+            fcntl.flock(journal, fcntl.LOCK_EX)
+            if not _same_file(journal, path):
+                continue
+            journal.write(line)
+            journal.flush()
+            if settings.COMMENT_BUFFER_FSYNC:
+                os.fsync(journal.fileno())
+            return
+
+
+def _rotate(path):
+    """Переименовывает журнал в пачку; писатели начнут новый журнал."""
+    while True:
+        try:
+            journal = open(path, encoding='utf-8')
+        except FileNotFoundError:
+            return None
+        with journal:
+            fcntl.flock(journal, fcntl.LOCK_EX)
+            if not _same_file(journal, path):
+                continue
+            batch = f'{path}.{uuid4().hex}.batch'
+            os.rename(path, batch)
+            os.utime(batch)
+            return batch
+
+
+def _quarantine(batch, rows):
+    """Откладывает строки, которые нельзя записать, в файл .rejected
+    рядом с пачкой, чтобы они не мешали остальным."""
+    with open(f'{batch}.rejected', 'a', encoding='utf-8') as target:
+        target.writelines(json.dumps(row) + '\n' for row in rows)
+    logger.warning(
+        'Комментарии к удалённым постам или от удалённых авторов '
+        'отложены в %s.rejected: %s', batch, len(rows)
+    )
+
+
+def _claim(batch):
+    """Открывает пачку под неблокирующей блокировкой. None — пачку
+    уже пишет другой процесс или она записана и удалена."""
+    try:
+        source = open(batch, encoding='utf-8')
+    except FileNotFoundError:
+        return None
+    try:
+        fcntl.flock(source, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        source.close()
+        return None
+    if not _same_file(source, batch):
+        source.close()
+        return None
+    return source
+
+
+def _apply(batch):
+    """Записывает пачку одной транзакцией и удаляет её файл.
+
+    Файл удаляется под блокировкой _claim, поэтому из нескольких
+    процессов, взявших одну пачку, её пишет только один.
+    """
+    source = _claim(batch)
+    if source is None:
+        return 0
+    with source:
+        rows = [json.loads(line) for line in source if line.strip()]
+        count = _save(batch, rows)
+        os.remove(batch)
+    logger.info('Записано комментариев из буфера: %s', count)
+    return count
+
+
+def _save(batch, rows):
+    """Комментарии к постам и от авторов, удалённых после постановки
+    в буфер, не записываются, а откладываются через _quarantine."""
+    posts = set(Post.objects.filter(
+        pk__in={row['post'] for row in rows}
+    ).values_list('pk', flat=True))
+    authors = set(User.objects.filter(
+        pk__in={row['author'] for row in rows}
+    ).values_list('pk', flat=True))
+    kept, orphans = [], []
+    for row in rows:
+        if row['post'] in posts and row['author'] in authors:
+            kept.append(row)
+        else:
+            orphans.append(row)
+    if orphans:
+        _quarantine(batch, orphans)
+    comments = [
+        Comment(
+            post_id=row['post'],
+            author_id=row['author'],
+            text=row['text'],
+            pub_date=parse_datetime(row['pub_date']),
+        )
+        for row in kept
+    ]
+    with transaction.atomic():
+        saved = set(Comment.objects.filter(
+            post_id__in={comment.post_id for comment in comments},
+            pub_date__in={comment.pub_date for comment in comments},
+        ).values_list('post_id', 'author_id', 'pub_date'))
+        for comment in comments:
+            if (comment.post_id, comment.author_id,
+                    comment.pub_date) not in saved:
+                # raw сохраняет pub_date из журнала вместо auto_now_add.
+                comment.save_base(raw=True)
+    return len(comments)
+
+
+def enqueue(post, author, text):
+    """Дописывает комментарий в журнал процесса и возвращает
+    несохранённый объект.
+
+    Когда в журнале COMMENT_BUFFER_SIZE строк или первой строке больше
+    COMMENT_BUFFER_MAX_DELAY секунд, ставится задача flush_comment_buffer;
+    ещё журналы записывает команда flush_comments. Каждая пачка пишется
+    одной транзакцией и удаляется после коммита, а при повторе после
+    сбоя уже записанные комментарии пропускаются. Запрос, добавивший
+    комментарий, в базу не пишет и ошибок записи не получает.
+    """
+    comment = Comment(
+        post=post, author=author, text=text, pub_date=timezone.now()
+    )
+    _append(journal_path(), json.dumps({
+        'post': post.pk,
+        'author': author.pk,
+        'text': text,
+        'pub_date': comment.pub_date.isoformat(),
+    }) + '\n')
+    _state['count'] += 1
+    _state['first'] = _state['first'] or time()
+    age = time() - _state['first']
+    if (_state['count'] >= settings.COMMENT_BUFFER_SIZE
+            or age >= settings.COMMENT_BUFFER_MAX_DELAY):
+        _state.update(count=0, first=None)
+        try:
+            schedule_flush()
+        except Exception:
+            logger.exception('Не удалось поставить запись буфера комментариев')
+    return comment
+
+
+def schedule_flush():
+    """Ставит задачу записи буфера, если она ещё не в очереди."""
+    if not Task.objects.filter(name=FLUSH_TASK, status=Task.PENDING).exists():
+        enqueue_task(FLUSH_TASK)
+
+
+def flush():
+    """Записывает журнал текущего процесса."""
+    _state.update(count=0, first=None)
+    batch = _rotate(journal_path())
+    return _apply(batch) if batch else 0
+
+
+def flush_all(stale_after=60):
+    """Записывает журналы всех процессов и пачки, брошенные упавшими
+    процессами больше stale_after секунд назад."""
+    pattern = os.path.join(settings.COMMENT_BUFFER_DIR, '*')
+    count = 0
+    for path in glob.glob(pattern + '.ndjson'):
+        batch = _rotate(path)
+        if batch:
+            count += _apply(batch)
+    for batch in glob.glob(pattern + '.batch'):
+        try:
+            stale = time() - os.path.getmtime(batch) > stale_after
+        except FileNotFoundError:
+            continue
+        if stale:
+            count += _apply(batch)
+    return count
+
+
+def remember(request, comment):
+    request.session[SESSION_KEY] = request.session.get(SESSION_KEY, []) + [{
+        'post': comment.post_id,
+        'text': comment.text,
+        'pub_date': comment.pub_date.isoformat(),
+    }]
+
+
+def pending_for(request, post):
+    """Ещё не записанные комментарии пользователя к посту, новые сверху.
+    Уже записанные убираются из сессии."""
+    pending = request.session.get(SESSION_KEY)
+    if not pending:
+        return []
+    own = [row for row in pending if row['post'] == post.pk]
+    if not own:
+        return []
+    saved = {
+        pub_date.isoformat() for pub_date in Comment.objects.filter(
+            post_id=post.pk, author=request.user,
+            pub_date__in=[parse_datetime(row['pub_date']) for row in own],
+        ).values_list('pub_date', flat=True)
+    }
+    if saved:
+        request.session[SESSION_KEY] = [
+            row for row in pending
+            if row['post'] != post.pk or row['pub_date'] not in saved
+        ]
+    return [
+        Comment(
+            post=post, author=request.user, text=row['text'],
+            pub_date=parse_datetime(row['pub_date']),
+        )
+        for row in reversed(own) if row['pub_date'] not in saved
+    ]
@@ -0,0 +1,36 @@
+from django.db.models import (
+    Count, DateTimeField, F, Max, OuterRef, Subquery, Value
+)
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Comment, Post
+
+
+def comment_stats():
+    """Подзапросы с числом и датой последнего комментария поста."""
+    comments = Comment.objects.filter(
+        post=OuterRef('pk')
+    ).order_by().values('post')
+    count = comments.annotate(count=Count('pk')).values('count')
+    last = comments.annotate(last=Max('pub_date')).values('last')
+    return Coalesce(Subquery(count), 0), Subquery(last)
+
+
+def comment_added(comment):
+    """Комментарии из буфера приходят не по порядку дат, поэтому
+    last_comment_at только растёт."""
+    pub_date = Value(comment.pub_date, output_field=DateTimeField())
+    Post.objects.filter(pk=comment.post_id).update(
+        comment_count=F('comment_count') + 1,
+        last_comment_at=Greatest(
+            Coalesce('last_comment_at', pub_date), pub_date
+        ),
+    )
+
+
+def refresh_comment_stats(post_ids):
+    """Пересчитывает счётчики постов одним UPDATE с подзапросами."""
+    count, last = comment_stats()
+    return Post.objects.filter(pk__in=post_ids).update(
+        comment_count=count, last_comment_at=last,
+    )
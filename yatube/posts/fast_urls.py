@@ -0,0 +1,56 @@
+import re
+from functools import lru_cache
+from urllib.parse import quote
+
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.urls import NoReverseMatch, get_script_prefix, reverse
+from django.urls.converters import (
+    IntConverter, SlugConverter, StringConverter
+)
+from django.utils.http import RFC3986_SUBDELIMS
+
+PLACEHOLDER = '9081726354'
+SAFE_CHARS = RFC3986_SUBDELIMS + '/~:@'
+
+ROUTES = {
+    'posts:profile': ('username', StringConverter()),
+    'posts:post_detail': ('post_id', IntConverter()),
+    'posts:group_list': ('slug', SlugConverter()),
+}
+
+
+@lru_cache(maxsize=None)
+def _url_template(name, script_prefix):
+    """Разбивает reverse() маршрута на части до и после аргумента."""
+    kwarg, _ = ROUTES[name]
+    url = reverse(name, kwargs={kwarg: PLACEHOLDER})
+    if url.count(PLACEHOLDER) != 1:
+        raise NoReverseMatch(f'Не удалось построить шаблон для {name}')
+    head, tail = url.split(PLACEHOLDER)
+    return head, tail
+
+
+def build_url(name, value):
+    """Быстрая замена reverse() для маршрутов из ROUTES.
+
+    Значение проверяется регулярным выражением конвертера и
+    экранируется так же, как это делает reverse(), поэтому результат
+    совпадает с ним символ в символ.
+    """
+    if name not in ROUTES:
+        return reverse(name, args=[value])
+    _, converter = ROUTES[name]
+    text = converter.to_url(value)
+    if not re.fullmatch(converter.regex, text):
+        raise NoReverseMatch(
+            f'Недопустимое значение {value!r} для маршрута {name}'
+        )
+    head, tail = _url_template(name, get_script_prefix())
+    return head + quote(text, safe=SAFE_CHARS) + tail
+
+
+@receiver(setting_changed)
+def clear_url_templates(setting, **kwargs):
+    if setting == 'ROOT_URLCONF':
+        _url_template.cache_clear()
@@ -0,0 +1,133 @@
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Follow, User
+
+TYPECODE = 'q'
+FOLLOWING = 'following'
+FOLLOWERS = 'followers'
+
+
+def cache_key(kind, user_id):
+    return f'follow_graph:{kind}:{user_id}'
+
+
+def _load(kind, user_id):
+    """Отсортированный массив id из кеша, при промахе — из Follow."""
+    key = cache_key(kind, user_id)
+    ids = array(TYPECODE)
+    raw = cache.get(key)
+    if raw is not None:
+        ids.frombytes(raw)
+        return ids
+    if kind == FOLLOWING:
+        rows = Follow.objects.filter(user_id=user_id).order_by(
+            'author_id').values_list('author_id', flat=True)
+    else:
+        rows = Follow.objects.filter(author_id=user_id).order_by(
+            'user_id').values_list('user_id', flat=True)
+    ids.extend(rows)
+    cache.set(key, ids.tobytes(), settings.FOLLOW_GRAPH_TIMEOUT)
+    return ids
+
+
+def following_ids(user_id):
+    """id авторов, на которых подписан пользователь, по возрастанию."""
+    return _load(FOLLOWING, user_id)
+
+
+def follower_ids(user_id):
+    """id подписчиков автора по возрастанию."""
+    return _load(FOLLOWERS, user_id)
+
+
+def is_following(user_id, author_id):
+    ids = following_ids(user_id)
+    index = bisect_left(ids, author_id)
+    return index < len(ids) and ids[index] == author_id
+
+
+def _delete_keys(keys):
+    """Удаляет ключи сразу и ещё раз после коммита: читатель, успевший
+    до коммита закешировать старый массив, не продержит его до конца
+    FOLLOW_GRAPH_TIMEOUT. Вне транзакции on_commit срабатывает сразу."""
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate(user_id, author_id):
+    _delete_keys([
+        cache_key(FOLLOWING, user_id),
+        cache_key(FOLLOWERS, author_id),
+    ])
+
+
+def invalidate_many(user_id, author_ids):
+    keys = [cache_key(FOLLOWING, user_id)]
+    keys.extend(cache_key(FOLLOWERS, author_id) for author_id in author_ids)
+    _delete_keys(keys)
+
+
+def chunks(items, size):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _resolve_authors(user, usernames):
+    """id авторов по именам; себя и несуществующих отбрасывает."""
+    usernames = set(usernames) - {user.username}
+    author_ids = {}
+    for chunk in chunks(usernames, settings.BULK_BATCH_SIZE):
+        author_ids.update(
+            User.objects.filter(username__in=chunk).values_list(
+                'username', 'id')
+        )
+    missing = sorted(usernames - author_ids.keys())
+    return set(author_ids.values()), missing
+
+
+def bulk_follow(user, usernames):
+    """Подписывает пользователя на авторов пачками.
+
+    Ограничения unique_follow и not_yourself_follow проверяются заранее
+    для всего списка, а bulk_create(ignore_conflicts=True) страхует от
+    параллельной подписки. Возвращает число новых подписок и список
+    неизвестных имён.
+    """
+    author_ids, missing = _resolve_authors(user, usernames)
+    with transaction.atomic():
+        existing = set()
+        for chunk in chunks(author_ids, settings.BULK_BATCH_SIZE):
+            existing.update(
+                Follow.objects.filter(
+                    user=user, author_id__in=chunk
+                ).values_list('author_id', flat=True)
+            )
+        new_ids = author_ids - existing
+        Follow.objects.bulk_create(
+            [Follow(user=user, author_id=author_id)
+             for author_id in new_ids],
+            batch_size=settings.BULK_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+    invalidate_many(user.id, new_ids)
+    return len(new_ids), missing
+
+
+def bulk_unfollow(user, usernames):
+    """Отписывает пользователя от авторов пачками."""
+    author_ids, missing = _resolve_authors(user, usernames)
+    deleted = 0
+    with transaction.atomic():
+        for chunk in chunks(author_ids, settings.BULK_BATCH_SIZE):
+            count, _ = Follow.objects.filter(
+                user=user, author_id__in=chunk
+            ).delete()
+            deleted += count
+    invalidate_many(user.id, author_ids)
+    return deleted, missing
@@ -1,6 +1,8 @@
 from django import forms
+from django.conf import settings
+from django.contrib.admin.helpers import ActionForm
 
-from .models import Comment, Post
+from .models import Comment, Group, Post
 
 
 class PostForm(forms.ModelForm):
@@ -17,3 +19,28 @@ class CommentForm(forms.ModelForm):
     class Meta:
         model = Comment
         fields = ('text',)
+
+
+class BulkFollowForm(forms.Form):
+    usernames = forms.CharField(
+        widget=forms.Textarea,
+        help_text='Имена авторов через пробел, запятую или с новой строки'
+    )
+    unfollow = forms.BooleanField(required=False)
+
+    def clean_usernames(self):
+        usernames = self.cleaned_data['usernames'].replace(',', ' ').split()
+        if len(usernames) > settings.BULK_FOLLOW_LIMIT:
+            raise forms.ValidationError(
+                f'Не больше {settings.BULK_FOLLOW_LIMIT} имён за раз'
+            )
+        return usernames
+
+
+class ModerationActionForm(ActionForm):
+    group = forms.ModelChoiceField(
+        Group.objects.all(),
+        required=False,
+        label='Группа',
+        help_text='Куда перенести посты; пусто — убрать из группы'
+    )
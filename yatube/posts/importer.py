@@ -0,0 +1,257 @@
+import json
+import logging
+import os
+from contextlib import contextmanager, nullcontext
+from time import monotonic
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Case, DateTimeField, Max, Value, When
+from django.utils.dateparse import parse_datetime
+
+from .counters import refresh_comment_stats
+from .follow_graph import chunks
+from .models import Comment, Group, Post, User
+
+logger = logging.getLogger(__name__)
+
+KINDS = ('group', 'post', 'comment')
+# Три параметра на строку в UPDATE ... CASE: так запрос остаётся
+# в пределах 999 параметров старых сборок SQLite.
+DATES_PER_UPDATE = 300
+
+
+class InvalidRecord(ValueError):
+    pass
+
+
+def assign_ids(model, objects):
+    """Выдаёт id объектам без него, если база не возвращает их
+    из bulk_create: SQLite в Django 2.2 так же нумерует строки после
+    текущего максимума, пока транзакция держит блокировку записи.
+    Последовательность потом сдвигается через sequence_reset_sql."""
+    if connection.features.can_return_ids_from_bulk_insert:
+        return
+    last = max(
+        [model.objects.aggregate(last=Max('pk'))['last'] or 0]
+        + [obj.pk for obj in objects if obj.pk is not None]
+    )
+    for obj in objects:
+        if obj.pk is None:
+            last += 1
+            obj.pk = last
+
+
+def restore_pub_dates(model, objects, dates):
+    """Возвращает объектам и их строкам pub_date из источника.
+
+    auto_now_add перезаписывает дату при вставке, поэтому она
+    проставляется после неё UPDATE с CASE по пачкам. Само поле модели
+    не меняется, так что сохранения в других потоках не затронуты.
+    """
+    pairs = list(zip(objects, dates))
+    for obj, date in pairs:
+        obj.pub_date = date
+    for chunk in chunks(pairs, DATES_PER_UPDATE):
+        model.objects.filter(pk__in=[obj.pk for obj, _ in chunk]).update(
+            pub_date=Case(
+                *(
+                    When(pk=obj.pk, then=Value(
+                        date, output_field=DateTimeField()
+                    ))
+                    for obj, date in chunk
+                ),
+                output_field=DateTimeField(),
+            )
+        )
+
+
+@contextmanager
+def deferred_indexes(*models):
+    """Снимает индексы из Meta.indexes на время загрузки и строит их
+    заново одним проходом в конце.
+
+    Индексы внешних ключей и полей с db_index остаются на месте: их
+    имена и DDL зависят от базы, и вставка по-прежнему их обновляет.
+    """
+    indexes = [
+        (model, index) for model in models for index in model._meta.indexes
+    ]
+    with connection.schema_editor() as editor:
+        for model, index in indexes:
+            editor.remove_index(model, index)
+    try:
+        yield
+    finally:
+        with connection.schema_editor() as editor:
+            for model, index in indexes:
+                editor.add_index(model, index)
+
+
+class ContentImporter:
+    """Потоковый импорт групп, постов и комментариев из NDJSON.
+
+    Строки копятся по видам, и каждые batch_size строк сбрасываются
+    в одной транзакции; размер отдельного INSERT bulk_create подбирает
+    под ограничения базы. Авторы и группы ищутся по имени и slug
+    в словарях в памяти, id постов и комментариев из источника
+    сохраняются.
+    """
+
+    def __init__(self, media_dir=None, batch_size=None, log=None):
+        self.media_dir = media_dir
+        self.batch_size = batch_size or settings.BULK_BATCH_SIZE
+        self.log = log or (lambda message: None)
+        self.users = {}
+        self.groups = dict(Group.objects.values_list('slug', 'id'))
+        self.buffers = {kind: [] for kind in KINDS}
+        self.counts = dict.fromkeys(KINDS, 0)
+        self.commented_post_ids = set()
+        self.started = monotonic()
+
+    def resolve_users(self, usernames):
+        missing = set(usernames) - self.users.keys()
+        if not missing:
+            return
+        for chunk in chunks(missing, self.batch_size):
+            self.users.update(
+                User.objects.filter(username__in=chunk).values_list(
+                    'username', 'id')
+            )
+        new_users = []
+        for username in missing - self.users.keys():
+            user = User(username=username)
+            user.set_unusable_password()
+            new_users.append(user)
+        User.objects.bulk_create(new_users)
+        for chunk in chunks(
+            [user.username for user in new_users], self.batch_size
+        ):
+            self.users.update(
+                User.objects.filter(username__in=chunk).values_list(
+                    'username', 'id')
+            )
+
+    def copy_image(self, path):
+        """Копирует картинку в хранилище; отсутствующая или нечитаемая
+        пропускается, и пост импортируется без неё."""
+        if not path or self.media_dir is None:
+            return ''
+        try:
+            with open(os.path.join(self.media_dir, path), 'rb') as source:
+                return default_storage.save(
+                    f'posts/{os.path.basename(path)}', File(source)
+                )
+        except OSError as error:
+            logger.warning('Картинка %s пропущена: %s', path, error)
+            return ''
+
+    def flush_groups(self, rows):
+        Group.objects.bulk_create(
+            [
+                Group(
+                    slug=row['slug'], title=row['title'],
+                    description=row.get('description', ''),
+                )
+                for row in rows if row['slug'] not in self.groups
+            ]
+        )
+        self.groups.update(
+            Group.objects.filter(
+                slug__in=[row['slug'] for row in rows]
+            ).values_list('slug', 'id')
+        )
+
+    def flush_posts(self, rows):
+        self.resolve_users(row['author'] for row in rows)
+        posts = [
+            Post(
+                id=row['id'],
+                text=row['text'],
+                author_id=self.users[row['author']],
+                group_id=self.groups.get(row.get('group')),
+                image=self.copy_image(row.get('image')),
+            )
+            for row in rows
+        ]
+        Post.objects.bulk_create(posts)
+        restore_pub_dates(
+            Post, posts, [parse_datetime(row['pub_date']) for row in rows]
+        )
+
+    def flush_comments(self, rows):
+        self.resolve_users(row['author'] for row in rows)
+        comments = [
+            Comment(
+                id=row.get('id'),
+                post_id=row['post'],
+                text=row['text'],
+                author_id=self.users[row['author']],
+            )
+            for row in rows
+        ]
+        assign_ids(Comment, comments)
+        Comment.objects.bulk_create(comments)
+        restore_pub_dates(
+            Comment, comments,
+            [parse_datetime(row['pub_date']) for row in rows]
+        )
+        self.commented_post_ids.update(row['post'] for row in rows)
+
+    def flush(self):
+        """Сбрасывает все буферы; группы и посты раньше комментариев,
+        которые на них ссылаются."""
+        with transaction.atomic():
+            for kind in KINDS:
+                rows = self.buffers[kind]
+                if rows:
+                    getattr(self, f'flush_{kind}s')(rows)
+                    self.counts[kind] += len(rows)
+                    self.buffers[kind] = []
+        self.log(self.progress())
+
+    def add(self, row):
+        kind = row.get('type')
+        if kind not in KINDS:
+            raise InvalidRecord(f'неизвестный тип записи {kind!r}')
+        self.buffers[kind].append(row)
+        if len(self.buffers[kind]) >= self.batch_size:
+            self.flush()
+
+    def finish(self):
+        self.flush()
+        for chunk in chunks(self.commented_post_ids, self.batch_size):
+            refresh_comment_stats(chunk)
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(
+                no_style(), [Group, Post, Comment]
+            ):
+                cursor.execute(sql)
+
+    def progress(self):
+        elapsed = monotonic() - self.started
+        total = sum(self.counts.values())
+        return (
+            ', '.join(f'{kind}: {count}' for kind, count
+                      in self.counts.items())
+            + f'; {total / elapsed if elapsed else 0:.0f} строк/с'
+        )
+
+    def run(self, lines, defer_indexes=False):
+        indexes = (
+            deferred_indexes(Post, Comment) if defer_indexes
+            else nullcontext()
+        )
+        with indexes:
+            for number, line in enumerate(lines, 1):
+                if not line.strip():
+                    continue
+                try:
+                    self.add(json.loads(line))
+                except (ValueError, KeyError) as error:
+                    raise InvalidRecord(f'строка {number}: {error}')
+            self.finish()
+        return self.counts
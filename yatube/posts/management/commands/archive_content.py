@@ -0,0 +1,23 @@
+from time import monotonic
+
+from django.core.management.base import BaseCommand
+
+from posts.archive import archive_content
+
+
+class Command(BaseCommand):
+    help = 'Переносит старые неактивные посты и их комментарии в архив.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=None,
+            help='Возраст поста в днях, после которого он уходит в архив',
+        )
+
+    def handle(self, *args, **options):
+        started = monotonic()
+        count = archive_content(options['days'])
+        self.stdout.write(
+            f'Перенесено в архив постов: {count} '
+            f'за {monotonic() - started:.2f} с'
+        )
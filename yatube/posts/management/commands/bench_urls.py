@@ -0,0 +1,36 @@
+from timeit import timeit
+
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+
+from posts.fast_urls import ROUTES, build_url
+
+SAMPLES = {
+    'posts:profile': 'leo',
+    'posts:post_detail': 1024,
+    'posts:group_list': 'cats',
+}
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает build_url() с reverse() на горячих маршрутах.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--number', type=int, default=100000,
+            help='Количество вызовов на маршрут',
+        )
+
+    def handle(self, *args, **options):
+        number = options['number']
+        for name, (kwarg, _) in ROUTES.items():
+            value = SAMPLES[name]
+            kwargs = {kwarg: value}
+            assert build_url(name, value) == reverse(name, kwargs=kwargs)
+            slow = timeit(lambda: reverse(name, kwargs=kwargs), number=number)
+            fast = timeit(lambda: build_url(name, value), number=number)
+            self.stdout.write(
+                f'{name}: reverse() {slow / number * 1e6:.2f} мкс, '
+                f'build_url() {fast / number * 1e6:.2f} мкс, '
+                f'ускорение x{slow / fast:.1f}'
+            )
@@ -0,0 +1,49 @@
+from statistics import mean
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Follow, Post
+
+
+class Command(BaseCommand):
+    help = 'Замеряет время ответа и число запросов ключевых страниц.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--number', type=int, default=50,
+            help='Сколько раз запрашивать каждую страницу',
+        )
+
+    def handle(self, *args, **options):
+        follow = Follow.objects.select_related('user', 'author').first()
+        post = Post.objects.first()
+        if follow is None or post is None:
+            raise CommandError('Нужны хотя бы один пост и одна подписка')
+        client = Client()
+        client.force_login(follow.user)
+        urls = {
+            'profile': reverse('posts:profile', args=[follow.author]),
+            'post_detail': reverse('posts:post_detail', args=[post.pk]),
+            'follow_index': reverse('posts:follow_index'),
+        }
+        for name, url in urls.items():
+            client.get(url)
+            reset_queries()
+            with CaptureQueriesContext(connection) as queries:
+                client.get(url)
+            timings = []
+            for _ in range(options['number']):
+                started = perf_counter()
+                client.get(url)
+                timings.append(perf_counter() - started)
+            timings.sort()
+            self.stdout.write(
+                f'{name}: запросов к БД {len(queries)}, '
+                f'среднее {mean(timings) * 1000:.2f} мс, '
+                f'p95 {timings[int(len(timings) * 0.95)] * 1000:.2f} мс'
+            )
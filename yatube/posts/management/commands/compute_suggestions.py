@@ -0,0 +1,23 @@
+from time import monotonic
+
+from django.core.management.base import BaseCommand
+
+from posts.suggestions import compute_suggestions
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает рекомендации «На кого подписаться».'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit', type=int, default=None,
+            help='Сколько авторов сохранять на пользователя',
+        )
+
+    def handle(self, *args, **options):
+        started = monotonic()
+        count = compute_suggestions(options['limit'])
+        self.stdout.write(
+            f'Сохранено рекомендаций: {count} '
+            f'за {monotonic() - started:.2f} с'
+        )
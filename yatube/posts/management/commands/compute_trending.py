@@ -0,0 +1,17 @@
+from time import monotonic
+
+from django.core.management.base import BaseCommand
+
+from posts.trending import compute_trending
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает популярные посты и группы.'
+
+    def handle(self, *args, **options):
+        started = monotonic()
+        posts_count, groups_count = compute_trending()
+        self.stdout.write(
+            f'Популярных постов: {posts_count}, групп: {groups_count} '
+            f'за {monotonic() - started:.2f} с'
+        )
@@ -0,0 +1,28 @@
+from time import sleep
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.comment_buffer import flush_all
+
+
+class Command(BaseCommand):
+    help = (
+        'Записывает в базу буфер комментариев всех процессов; '
+        'с --loop работает постоянно и ограничивает задержку записи.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Повторять каждые COMMENT_BUFFER_MAX_DELAY секунд',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            count = flush_all()
+            if count:
+                self.stdout.write(f'Записано комментариев: {count}')
+            if not options['loop']:
+                break
+            sleep(settings.COMMENT_BUFFER_MAX_DELAY)
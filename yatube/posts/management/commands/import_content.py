@@ -0,0 +1,50 @@
+import sys
+from time import monotonic
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.importer import ContentImporter, InvalidRecord
+
+
+class Command(BaseCommand):
+    help = (
+        'Импортирует группы, посты и комментарии из NDJSON: по записи '
+        '{"type": "group"|"post"|"comment", ...} в строке.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл NDJSON, «-» — stdin')
+        parser.add_argument(
+            '--media-dir', default=None,
+            help='Каталог, относительно которого указаны картинки постов',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=None,
+            help='Сколько строк вставлять одним bulk_create',
+        )
+        parser.add_argument(
+            '--defer-indexes', action='store_true',
+            help='Снять индексы из Meta.indexes на время загрузки '
+                 'и построить их в конце',
+        )
+
+    def handle(self, *args, **options):
+        importer = ContentImporter(
+            media_dir=options['media_dir'],
+            batch_size=options['batch_size'],
+            log=self.stdout.write if options['verbosity'] > 1 else None,
+        )
+        started = monotonic()
+        source = (
+            sys.stdin if options['path'] == '-'
+            else open(options['path'], encoding='utf-8')
+        )
+        try:
+            with source:
+                importer.run(source, options['defer_indexes'])
+        except InvalidRecord as error:
+            raise CommandError(f'Ошибка импорта, {error}')
+        self.stdout.write(
+            f'Импортировано {importer.progress()}, '
+            f'всего {monotonic() - started:.2f} с'
+        )
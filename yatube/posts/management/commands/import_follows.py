@@ -0,0 +1,43 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import follow_graph
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Подписывает пользователя на авторов из файла (по имени в строке).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help='Кого подписываем')
+        parser.add_argument(
+            'path', help='Файл с именами авторов, «-» — stdin'
+        )
+        parser.add_argument(
+            '--unfollow', action='store_true',
+            help='Отписать от перечисленных авторов',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(
+                f'Пользователь {options["username"]} не найден'
+            )
+        if options['path'] == '-':
+            usernames = sys.stdin.read().split()
+        else:
+            with open(options['path'], encoding='utf-8') as source:
+                usernames = source.read().split()
+        if options['unfollow']:
+            count, missing = follow_graph.bulk_unfollow(user, usernames)
+            self.stdout.write(f'Удалено подписок: {count}')
+        else:
+            count, missing = follow_graph.bulk_follow(user, usernames)
+            self.stdout.write(f'Добавлено подписок: {count}')
+        if missing:
+            self.stderr.write(f'Не найдены: {", ".join(missing)}')
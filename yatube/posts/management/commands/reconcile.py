@@ -0,0 +1,57 @@
+from time import monotonic
+
+from django.core.management.base import BaseCommand
+
+from posts.reconcile import CHECKS, reconcile
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверяет денормализованные данные (счётчики комментариев, кеш '
+        'графа подписок, рекомендации) с исходными таблицами и чинит '
+        'расхождения короткими транзакциями.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='append', choices=sorted(CHECKS),
+            help='Какие проверки запускать, по умолчанию все',
+        )
+        parser.add_argument(
+            '--after', type=int, default=0,
+            help='Начать с id больше указанного',
+        )
+        parser.add_argument(
+            '--limit', type=int, default=None,
+            help='Сколько строк просмотреть в каждой проверке',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=None,
+            help='Строк в одной транзакции',
+        )
+        parser.add_argument(
+            '--pause', type=float, default=0,
+            help='Пауза между пачками в секундах, чтобы пропустить запись',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только посчитать расхождения, ничего не исправлять',
+        )
+
+    def handle(self, *args, **options):
+        for name in options['check'] or CHECKS:
+            started = monotonic()
+            result = reconcile(
+                name,
+                after=options['after'],
+                limit=options['limit'],
+                size=options['chunk_size'],
+                repair=not options['dry_run'],
+                pause=options['pause'],
+            )
+            self.stdout.write(
+                f'{name}: просмотрено {result["scanned"]}, '
+                f'расхождений {result["drifted"]}, '
+                f'последний id {result["last"]}, '
+                f'{monotonic() - started:.2f} с'
+            )
@@ -0,0 +1,139 @@
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from urllib.error import URLError
+from urllib.parse import urljoin
+from urllib.request import urlopen
+
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Count
+from django.test import Client
+from django.urls import reverse
+
+from posts.models import Group, User
+
+PROCESS_LOCAL = (LocMemCache, DummyCache)
+
+
+def hot_urls(pages, groups, authors):
+    """Первые страницы лент: главной, крупных групп и популярных авторов.
+
+    Главная заполняет кеш фрагментов index_page и trending, ленты групп
+    и профилей — кеш разметки длинных постов (text_html), профили ещё
+    и кеш графа подписок.
+    """
+    feeds = [('index', reverse('posts:index'))]
+    top_groups = Group.objects.annotate(
+        posts_count=Count('posts')
+    ).order_by('-posts_count').values_list('slug', flat=True)[:groups]
+    feeds.extend(
+        ('group_posts', reverse('posts:group_list', args=[slug]))
+        for slug in top_groups
+    )
+    top_authors = User.objects.annotate(
+        followers_count=Count('following')
+    ).order_by('-followers_count').values_list('username', flat=True)
+    feeds.extend(
+        ('profile', reverse('posts:profile', args=[username]))
+        for username in top_authors[:authors]
+    )
+    return [
+        (kind, f'{url}?page={page}')
+        for kind, url in feeds
+        for page in range(1, pages + 1)
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогревает кеши первых страниц главной, групп и профилей '
+        'популярных авторов. Без --base-url страницы рендерятся в этом '
+        'процессе, что возможно только с общим кешем (memcached, redis). '
+        'С LocMemCache и --base-url каждая страница прогревает кеш только '
+        'того воркера, который на неё ответил.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pages', type=int, default=3,
+            help='Сколько первых страниц каждой ленты прогревать',
+        )
+        parser.add_argument(
+            '--groups', type=int, default=10,
+            help='Сколько групп с наибольшим числом постов прогревать',
+        )
+        parser.add_argument(
+            '--authors', type=int, default=20,
+            help='Сколько авторов с наибольшим числом подписчиков прогревать',
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=4,
+            help='Сколько страниц запрашивать параллельно',
+        )
+        parser.add_argument(
+            '--base-url', default=None,
+            help='Адрес работающего сервера, например http://127.0.0.1:8000',
+        )
+
+    def fetch_local(self, url):
+        try:
+            return Client().get(url).status_code
+        finally:
+            connections.close_all()
+
+    def fetch_remote(self, url):
+        try:
+            with urlopen(urljoin(self.base_url, url)) as response:
+                response.read()
+                return response.status
+        except URLError as error:
+            return getattr(error, 'code', str(error.reason))
+
+    def timed(self, item):
+        kind, url = item
+        started = perf_counter()
+        status = self.fetch(url)
+        return kind, url, status, perf_counter() - started
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1:
+            raise CommandError('--concurrency должен быть больше нуля')
+        self.base_url = options['base_url']
+        backend = caches['default']
+        if not self.base_url and isinstance(backend, PROCESS_LOCAL):
+            raise CommandError(
+                f'Кеш {type(backend).__name__} виден только этому процессу, '
+                'веб-воркеры его не увидят; укажите --base-url'
+            )
+        if isinstance(backend, PROCESS_LOCAL):
+            self.stderr.write(
+                f'Кеш {type(backend).__name__}: каждая страница прогреет '
+                'только воркер, который на неё ответит'
+            )
+        self.fetch = self.fetch_remote if self.base_url else self.fetch_local
+        urls = hot_urls(
+            options['pages'], options['groups'], options['authors']
+        )
+        started = perf_counter()
+        with ThreadPoolExecutor(options['concurrency']) as executor:
+            results = list(executor.map(self.timed, urls))
+        elapsed = perf_counter() - started
+        summary = {}
+        for kind, url, status, duration in results:
+            if options['verbosity'] > 1:
+                self.stdout.write(f'{status} {url} {duration * 1000:.1f} мс')
+            count, total, failed = summary.get(kind, (0, 0, 0))
+            summary[kind] = (
+                count + 1, total + duration, failed + (status != 200)
+            )
+        for kind, (count, total, failed) in summary.items():
+            self.stdout.write(
+                f'{kind}: страниц {count}, ошибок {failed}, '
+                f'суммарно {total:.2f} с'
+            )
+        self.stdout.write(
+            f'Прогрето страниц: {len(results)} за {elapsed:.2f} с'
+        )
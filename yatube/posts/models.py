@@ -1,13 +1,38 @@
+from hashlib import md5
+
 from django.conf import settings
+from django.core.cache import cache
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.template.defaultfilters import linebreaks_filter
+from django.utils.safestring import mark_safe
 
 from core.models import CreatedModel
+from .fast_urls import build_url
 
 
 User = get_user_model()
 
 
+def cached_linebreaks(prefix, pk, text):
+    """Возвращает text|linebreaks, закешированный по id и версии текста.
+
+    Версия — хеш текста, поэтому правка поста сразу даёт новый ключ,
+    а повторно выданный SQLite id не подхватит чужой HTML. Тексты
+    короче TEXT_CACHE_MIN_LENGTH размечаются без кеша: на них linebreaks
+    дешевле обращения к кешу по сети.
+    """
+    if len(text) < settings.TEXT_CACHE_MIN_LENGTH:
+        return mark_safe(linebreaks_filter(text))
+    version = md5(text.encode()).hexdigest()
+    key = f'{prefix}:{pk}:{version}'
+    html = cache.get(key)
+    if html is None:
+        html = linebreaks_filter(text)
+        cache.set(key, html, settings.TEXT_CACHE_TIMEOUT)
+    return mark_safe(html)
+
+
 class Group(models.Model):
     title = models.CharField(
         max_length=200,
@@ -31,6 +56,9 @@ class Group(models.Model):
     def __str__(self):
         return self.title
 
+    def get_absolute_url(self):
+        return build_url('posts:group_list', self.slug)
+
 
 class Post(CreatedModel):
     text = models.TextField(
@@ -63,14 +91,41 @@ class Post(CreatedModel):
         help_text='Загрузите картинку'
     )
 
+    comment_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Комментариев'
+    )
+
+    last_comment_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name='Последний комментарий'
+    )
+
     class Meta:
         ordering = ("-pub_date",)
+        indexes = [
+            models.Index(
+                fields=['-last_comment_at'],
+                name='post_last_comment_idx',
+                condition=models.Q(last_comment_at__isnull=False),
+            ),
+        ]
         verbose_name = "Пост"
         verbose_name_plural = "Посты"
 
     def __str__(self):
         return self.text[:settings.POST_SYMBOLS]
 
+    def get_absolute_url(self):
+        return build_url('posts:post_detail', self.pk)
+
+    @property
+    def text_html(self):
+        return cached_linebreaks('post_text', self.pk, self.text)
+
 
 class Comment(CreatedModel):
     post = models.ForeignKey(
@@ -93,12 +148,22 @@ class Comment(CreatedModel):
 
     class Meta:
         ordering = ('-pub_date',)
+        indexes = [
+            models.Index(
+                fields=['post', '-pub_date', '-id'],
+                name='comment_post_pub_date_idx',
+            ),
+        ]
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
 
     def __str__(self):
         return self.text[:settings.POST_SYMBOLS]
 
+    @property
+    def text_html(self):
+        return cached_linebreaks('comment_text', self.pk, self.text)
+
 
 class Follow(models.Model):
     user = models.ForeignKey(
@@ -130,3 +195,166 @@ class Follow(models.Model):
 
     def __str__(self):
         return f'{self.user} подписан на {self.author}'
+
+
+class FollowSuggestion(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='follow_suggestions',
+        verbose_name='Пользователь'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Рекомендуемый автор'
+    )
+    score = models.FloatField(verbose_name='Оценка')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'], name='unique_suggestion'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-score'], name='suggestion_user_score_idx'
+            ),
+        ]
+        ordering = ('-score',)
+        verbose_name = 'Рекомендация'
+        verbose_name_plural = 'Рекомендации'
+
+    def __str__(self):
+        return f'{self.user} может подписаться на {self.author}'
+
+
+class TrendingPost(models.Model):
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Пост'
+    )
+    score = models.FloatField(verbose_name='Оценка')
+
+    class Meta:
+        ordering = ('-score',)
+        verbose_name = 'Популярный пост'
+        verbose_name_plural = 'Популярные посты'
+
+    def __str__(self):
+        return f'{self.post} ({self.score:.2f})'
+
+
+class TrendingGroup(models.Model):
+    group = models.OneToOneField(
+        Group,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Группа'
+    )
+    score = models.FloatField(verbose_name='Оценка')
+
+    class Meta:
+        ordering = ('-score',)
+        verbose_name = 'Популярная группа'
+        verbose_name_plural = 'Популярные группы'
+
+    def __str__(self):
+        return f'{self.group} ({self.score:.2f})'
+
+
+class ArchivedPost(models.Model):
+    """Старый пост без свежих комментариев, вынесенный из горячей
+    таблицы. id совпадает с исходным, поэтому адрес поста не меняется."""
+    id = models.IntegerField(primary_key=True)
+    text = models.TextField(verbose_name='Текст поста')
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор'
+    )
+    group = models.ForeignKey(
+        Group,
+        blank=True,
+        null=True,
+        on_delete=models.SET_NULL,
+        related_name='+',
+        verbose_name='Группа'
+    )
+    image = models.ImageField(
+        verbose_name='Картинка',
+        upload_to='posts/',
+        blank=True
+    )
+    comment_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Комментариев'
+    )
+    last_comment_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Последний комментарий'
+    )
+    archived_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата архивации'
+    )
+
+    archived = True
+
+    class Meta:
+        ordering = ('-pub_date',)
+        verbose_name = 'Пост в архиве'
+        verbose_name_plural = 'Посты в архиве'
+
+    def __str__(self):
+        return self.text[:settings.POST_SYMBOLS]
+
+    def get_absolute_url(self):
+        return build_url('posts:post_detail', self.pk)
+
+    @property
+    def text_html(self):
+        return cached_linebreaks('post_text', self.pk, self.text)
+
+
+class ArchivedComment(models.Model):
+    id = models.IntegerField(primary_key=True)
+    post = models.ForeignKey(
+        ArchivedPost,
+        on_delete=models.CASCADE,
+        related_name='comments',
+        verbose_name='Пост'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор'
+    )
+    text = models.TextField(verbose_name='Текст комментария')
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+
+    class Meta:
+        ordering = ('-pub_date',)
+        indexes = [
+            models.Index(
+                fields=['post', '-pub_date', '-id'],
+                name='archived_comment_post_idx',
+            ),
+        ]
+        verbose_name = 'Комментарий в архиве'
+        verbose_name_plural = 'Комментарии в архиве'
+
+    def __str__(self):
+        return self.text[:settings.POST_SYMBOLS]
+
+    @property
+    def text_html(self):
+        return cached_linebreaks('comment_text', self.pk, self.text)
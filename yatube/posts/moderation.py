@@ -0,0 +1,129 @@
+import logging
+
+from django.conf import settings
+from django.db import transaction
+
+from . import follow_graph
+from .counters import refresh_comment_stats
+from .models import Comment, Follow, Post
+
+logger = logging.getLogger(__name__)
+
+
+def drain(queryset, handler, label):
+    """Обрабатывает id из queryset пачками по BULK_BATCH_SIZE, каждую
+    пачку в своей транзакции, и пишет прогресс в лог."""
+    ids = queryset.order_by().values_list('pk', flat=True)
+    done = 0
+    while True:
+        with transaction.atomic():
+            chunk = list(ids[:settings.BULK_BATCH_SIZE])
+            if not chunk:
+                return done
+            handler(chunk)
+        done += len(chunk)
+        logger.info('%s: обработано %s', label, done)
+
+
+def chunked(ids):
+    """Делит список id на части по BULK_BATCH_SIZE, чтобы ни один
+    запрос и ни одна фоновая задача не получали их все сразу."""
+    ids = list(ids)
+    for start in range(0, len(ids), settings.BULK_BATCH_SIZE):
+        yield ids[start:start + settings.BULK_BATCH_SIZE]
+
+
+# Пачки удаляются _raw_delete, без сигналов post_delete на каждую
+# строку: у Comment сигнал пересчитывает счётчики поста, у Follow
+# сбрасывает кеш графа подписок. Обработчики ниже делают то же самое
+# сами, один раз на пачку, а других получателей у этих сигналов нет.
+
+def _delete_comments(chunk):
+    comments = Comment.objects.filter(pk__in=chunk)
+    post_ids = set(comments.values_list('post_id', flat=True))
+    comments._raw_delete(comments.db)
+    refresh_comment_stats(post_ids)
+
+
+def _delete_posts(chunk):
+    # Счётчики пересчитывать не нужно: посты удаляются следом.
+    comments = Comment.objects.filter(post_id__in=chunk)
+    comments._raw_delete(comments.db)
+    Post.objects.filter(pk__in=chunk).delete()
+
+
+def _delete_follows(chunk):
+    follows = Follow.objects.filter(pk__in=chunk)
+    pairs = list(follows.values_list('user_id', 'author_id'))
+    follows._raw_delete(follows.db)
+    for user_id, author_id in pairs:
+        follow_graph.invalidate(user_id, author_id)
+
+
+def delete_comments(comment_ids):
+    return sum(
+        drain(
+            Comment.objects.filter(pk__in=chunk),
+            _delete_comments, 'Удаление комментариев'
+        )
+        for chunk in chunked(comment_ids)
+    )
+
+
+def delete_posts(post_ids):
+    return sum(
+        drain(
+            Post.objects.filter(pk__in=chunk),
+            _delete_posts, 'Удаление постов'
+        )
+        for chunk in chunked(post_ids)
+    )
+
+
+def reassign_group(post_ids, group_id):
+    """Переносит посты в группу; пачки берутся по ещё не перенесённым."""
+    return sum(
+        drain(
+            Post.objects.filter(pk__in=chunk).exclude(group_id=group_id),
+            lambda ids: Post.objects.filter(pk__in=ids).update(
+                group_id=group_id
+            ),
+            'Перенос постов'
+        )
+        for chunk in chunked(post_ids)
+    )
+
+
+def _delete_content(user_ids):
+    return {
+        'comments': drain(
+            Comment.objects.filter(author_id__in=user_ids),
+            _delete_comments, 'Удаление комментариев пользователей'
+        ),
+        'posts': drain(
+            Post.objects.filter(author_id__in=user_ids),
+            _delete_posts, 'Удаление постов пользователей'
+        ),
+        'follows': drain(
+            Follow.objects.filter(user_id__in=user_ids)
+            | Follow.objects.filter(author_id__in=user_ids),
+            _delete_follows, 'Удаление подписок пользователей'
+        ),
+    }
+
+
+def delete_user_content(user_ids):
+    """Удаляет комментарии, посты и подписки пользователей."""
+    result = {'comments': 0, 'posts': 0, 'follows': 0}
+    for chunk in chunked(user_ids):
+        for name, count in _delete_content(chunk).items():
+            result[name] += count
+    return result
+
+
+ACTIONS = {
+    'delete_comments': delete_comments,
+    'delete_posts': delete_posts,
+    'reassign_group': reassign_group,
+    'delete_user_content': delete_user_content,
+}
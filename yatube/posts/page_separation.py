@@ -1,7 +1,83 @@
+from datetime import datetime, timedelta
+
 from django.conf import settings
 from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Max, Q
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
 
 
 def get_page_obj(posts, page_num):
     paginator = Paginator(posts, settings.LIMIT)
     return paginator.get_page(page_num)
+
+
+def estimate_count(queryset):
+    """Приблизительное число строк таблицы без COUNT(*).
+
+    PostgreSQL хранит оценку в pg_class.reltuples, в остальных базах
+    берётся наибольший первичный ключ — это один шаг по индексу.
+    """
+    model = queryset.model
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE relname = %s',
+                [model._meta.db_table]
+            )
+            row = cursor.fetchone()
+        if row and row[0] > 0:
+            return int(row[0])
+    return model._default_manager.using(queryset.db).aggregate(
+        max_pk=Max('pk')
+    )['max_pk'] or 0
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор для больших таблиц: без фильтров и поиска число строк
+    оценивается, точный COUNT(*) считается только для выборок
+    и небольших таблиц."""
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where and not queryset.query.distinct:
+            estimate = estimate_count(queryset)
+            if estimate > settings.EXACT_COUNT_LIMIT:
+                return estimate
+        return super().count
+
+
+def encode_cursor(obj):
+    return f'{(obj.pub_date - EPOCH) // MICROSECOND}.{obj.pk}'
+
+
+def decode_cursor(cursor):
+    try:
+        micros, pk = (int(part) for part in cursor.split('.'))
+        return EPOCH + micros * MICROSECOND, pk
+    except (AttributeError, ValueError, OverflowError):
+        return None
+
+
+def get_cursor_page(queryset, cursor, limit):
+    """Страница по ключу (pub_date, pk), от новых к старым.
+
+    Возвращает объекты страницы и курсор следующей страницы или None.
+    """
+    queryset = queryset.order_by('-pub_date', '-pk')
+    position = decode_cursor(cursor)
+    if position is not None:
+        pub_date, pk = position
+        queryset = queryset.filter(
+            Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=pk)
+        )
+    objects = list(queryset[:limit + 1])
+    if len(objects) <= limit:
+        return objects, None
+    return objects[:limit], encode_cursor(objects[limit - 1])
@@ -0,0 +1,140 @@
+from array import array
+from collections import defaultdict
+from time import sleep
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Exists, Max, OuterRef, Q
+
+from . import follow_graph
+from .counters import refresh_comment_stats
+from .models import (
+    ArchivedComment, ArchivedPost, Comment, Follow, FollowSuggestion, Post,
+    User
+)
+
+
+def keyset_chunks(queryset, after=0, limit=None, size=None, pause=0):
+    """id строк по возрастанию пачками; каждая пачка начинается после
+    последнего id предыдущей, поэтому скан не держит курсор и блокировку
+    и может быть продолжен с любого места."""
+    size = size or settings.BULK_BATCH_SIZE
+    scanned = 0
+    while limit is None or scanned < limit:
+        take = size if limit is None else min(size, limit - scanned)
+        ids = list(
+            queryset.filter(pk__gt=after).order_by('pk').values_list(
+                'pk', flat=True)[:take]
+        )
+        if not ids:
+            return
+        yield ids
+        after = ids[-1]
+        scanned += len(ids)
+        if pause:
+            sleep(pause)
+
+
+def _stats_drift(posts, comments, post_ids):
+    stored = posts.filter(pk__in=post_ids).values_list(
+        'pk', 'comment_count', 'last_comment_at'
+    )
+    actual = {
+        row['post_id']: (row['count'], row['last'])
+        for row in comments.filter(post_id__in=post_ids).order_by().values(
+            'post_id').annotate(count=Count('pk'), last=Max('pub_date'))
+    }
+    return [
+        pk for pk, count, last in stored
+        if (count, last) != actual.get(pk, (0, None))
+    ]
+
+
+def check_post_counters(post_ids, repair):
+    """Счётчик и дата последнего комментария постов."""
+    with transaction.atomic():
+        drifted = _stats_drift(Post.objects, Comment.objects, post_ids)
+        if repair and drifted:
+            refresh_comment_stats(drifted)
+    return len(drifted)
+
+
+def check_archived_counters(post_ids, repair):
+    with transaction.atomic():
+        drifted = _stats_drift(
+            ArchivedPost.objects, ArchivedComment.objects, post_ids
+        )
+        for pk in drifted if repair else ():
+            comments = ArchivedComment.objects.filter(post_id=pk)
+            ArchivedPost.objects.filter(pk=pk).update(
+                comment_count=comments.count(),
+                last_comment_at=comments.aggregate(
+                    last=Max('pub_date'))['last'],
+            )
+    return len(drifted)
+
+
+def check_follow_cache(user_ids, repair):
+    """Закешированные массивы подписок и подписчиков против Follow;
+    устаревшие ключи удаляются и при следующем чтении строятся заново."""
+    keys = {
+        follow_graph.cache_key(kind, user_id): (kind, user_id)
+        for kind in (follow_graph.FOLLOWING, follow_graph.FOLLOWERS)
+        for user_id in user_ids
+    }
+    cached = cache.get_many(keys)
+    if not cached:
+        return 0
+    actual = defaultdict(list)
+    pairs = Follow.objects.filter(
+        Q(user_id__in=user_ids) | Q(author_id__in=user_ids)
+    ).values_list('user_id', 'author_id')
+    for user_id, author_id in pairs:
+        actual[follow_graph.FOLLOWING, user_id].append(author_id)
+        actual[follow_graph.FOLLOWERS, author_id].append(user_id)
+    stale = []
+    for key, raw in cached.items():
+        ids = array(follow_graph.TYPECODE)
+        ids.frombytes(raw)
+        if list(ids) != sorted(actual[keys[key]]):
+            stale.append(key)
+    if repair and stale:
+        cache.delete_many(stale)
+    return len(stale)
+
+
+def check_suggestions(user_ids, repair):
+    """Рекомендации авторов, на которых пользователь уже подписан."""
+    stale = FollowSuggestion.objects.filter(user_id__in=user_ids).annotate(
+        followed=Exists(Follow.objects.filter(
+            user=OuterRef('user'), author=OuterRef('author')))
+    ).filter(followed=True)
+    if repair:
+        count, _ = FollowSuggestion.objects.filter(
+            pk__in=list(stale.values_list('pk', flat=True))
+        ).delete()
+        return count
+    return stale.count()
+
+
+CHECKS = {
+    'post_counters': (Post.objects.all(), check_post_counters),
+    'archived_counters': (ArchivedPost.objects.all(), check_archived_counters),
+    'follow_cache': (User.objects.all(), check_follow_cache),
+    'suggestions': (User.objects.all(), check_suggestions),
+}
+
+
+def reconcile(name, after=0, limit=None, size=None, repair=True, pause=0):
+    """Проверяет одну группу производных данных. Возвращает число
+    просмотренных строк, число расхождений и последний id — с него
+    можно продолжить следующий запуск."""
+    queryset, check = CHECKS[name]
+    scanned = drifted = 0
+    last = after
+    for ids in keyset_chunks(queryset, after, limit, size, pause):
+        drifted += check(ids, repair)
+        scanned += len(ids)
+        last = ids[-1]
+    return {'scanned': scanned, 'drifted': drifted, 'last': last}
@@ -0,0 +1,48 @@
+from threading import local
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import counters, follow_graph
+from .models import Comment, Follow
+
+_pending = local()
+
+
+def pending_post_ids():
+    """id постов, у которых удалялись комментарии в этом потоке и
+    счётчики ещё не пересчитаны."""
+    if not hasattr(_pending, 'post_ids'):
+        _pending.post_ids = set()
+    return _pending.post_ids
+
+
+def refresh_pending():
+    post_ids = list(pending_post_ids())
+    pending_post_ids().clear()
+    for chunk in follow_graph.chunks(post_ids, settings.BULK_BATCH_SIZE):
+        counters.refresh_comment_stats(chunk)
+
+
+@receiver([post_save, post_delete], sender=Follow)
+def follow_changed(sender, instance, **kwargs):
+    follow_graph.invalidate(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.comment_added(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    # Счётчики пересчитываются после коммита одним UPDATE на всё
+    # удаление: каскад поста с N комментариями не делает N запросов,
+    # а удалённые посты в UPDATE просто не попадают. После отката в
+    # наборе остаются лишние id, и следующий пересчёт их безвредно
+    # обновит.
+    pending_post_ids().add(instance.post_id)
+    transaction.on_commit(refresh_pending)
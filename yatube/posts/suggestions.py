@@ -0,0 +1,61 @@
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import Follow, FollowSuggestion
+
+FRIENDS_OF_FRIENDS_WEIGHT = 1.0
+CO_FOLLOW_WEIGHT = 0.5
+
+
+def load_graph():
+    following = defaultdict(list)
+    followers = defaultdict(list)
+    rows = Follow.objects.order_by().values_list('user_id', 'author_id')
+    for user_id, author_id in rows.iterator():
+        following[user_id].append(author_id)
+        followers[author_id].append(user_id)
+    return following, followers
+
+
+def score_authors(user_id, following, followers):
+    """Оценки авторов для пользователя.
+
+    Друзья друзей: авторы, на которых подписаны авторы пользователя.
+    Совместные подписки: авторы, на которых подписаны другие
+    подписчики тех же авторов; вклад такого подписчика делится на
+    число его подписок, чтобы «подписанные на всех» не доминировали.
+    """
+    scores = Counter()
+    for author_id in following[user_id]:
+        for candidate in following.get(author_id, ()):
+            scores[candidate] += FRIENDS_OF_FRIENDS_WEIGHT
+        for other_id in followers[author_id]:
+            if other_id == user_id:
+                continue
+            weight = CO_FOLLOW_WEIGHT / len(following[other_id])
+            for candidate in following[other_id]:
+                scores[candidate] += weight
+    for known_id in [user_id, *following[user_id]]:
+        scores.pop(known_id, None)
+    return scores
+
+
+def compute_suggestions(limit=None):
+    """Пересчитывает FollowSuggestion для всех, у кого есть подписки."""
+    limit = limit or settings.SUGGESTIONS_LIMIT
+    following, followers = load_graph()
+    suggestions = [
+        FollowSuggestion(user_id=user_id, author_id=author_id, score=score)
+        for user_id in following
+        for author_id, score in score_authors(
+            user_id, following, followers
+        ).most_common(limit)
+    ]
+    with transaction.atomic():
+        FollowSuggestion.objects.all().delete()
+        FollowSuggestion.objects.bulk_create(
+            suggestions, batch_size=settings.BULK_BATCH_SIZE
+        )
+    return len(suggestions)
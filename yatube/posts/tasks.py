@@ -0,0 +1,46 @@
+from sorl.thumbnail import get_thumbnail
+
+from core.tasks import task
+from .archive import archive_content
+from .comment_buffer import flush_all
+from .counters import refresh_comment_stats
+from .moderation import ACTIONS
+from .models import Post
+from .trending import compute_trending
+
+THUMBNAIL_GEOMETRY = '960x339'
+
+
+@task
+def generate_thumbnail(post_id):
+    post = Post.objects.filter(pk=post_id).first()
+    if post is not None and post.image:
+        get_thumbnail(
+            post.image, THUMBNAIL_GEOMETRY, crop='center', upscale=True
+        )
+
+
+@task
+def rebuild_comment_stats():
+    post_ids = Post.objects.values_list('pk', flat=True)
+    return refresh_comment_stats(post_ids)
+
+
+@task
+def refresh_trending():
+    return compute_trending()
+
+
+@task
+def moderate(action, ids, *args):
+    return ACTIONS[action](ids, *args)
+
+
+@task
+def archive_old_content():
+    return archive_content()
+
+
+@task
+def flush_comment_buffer():
+    return flush_all()
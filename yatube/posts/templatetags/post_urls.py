@@ -0,0 +1,10 @@
+from django import template
+
+from posts.fast_urls import build_url
+
+register = template.Library()
+
+
+@register.simple_tag
+def fast_url(name, value):
+    return build_url(name, value)
@@ -0,0 +1,73 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.archive import archive_content
+from posts.models import ArchivedComment, ArchivedPost, Comment, Group, Post
+
+from .factories import CommentFactory, PostFactory
+
+User = get_user_model()
+
+
+@override_settings(BULK_BATCH_SIZE=2, COMMENTS_LIMIT=2)
+class ArchiveTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        long_ago = timezone.now() - timedelta(days=400)
+        cls.old_posts = PostFactory.create_batch(
+            3, author=cls.author, group=cls.group, pub_date=long_ago,
+            text=lambda number: f'Старый пост {number}',
+        )
+        cls.discussed = PostFactory.create(
+            author=cls.author, text='Старый, но обсуждаемый',
+            pub_date=long_ago,
+        )
+        cls.fresh = Post.objects.create(author=cls.author, text='Свежий')
+        CommentFactory.create_batch(
+            3, post=cls.old_posts[0], author=cls.author, text='Давно',
+            pub_date=long_ago,
+        )
+        Comment.objects.create(
+            post=cls.discussed, author=cls.author, text='Недавно'
+        )
+
+    def test_archive_moves_inactive_posts(self):
+        """В архив уходят только старые посты без свежих комментариев."""
+        self.assertEqual(archive_content(), 3)
+        self.assertEqual(
+            set(Post.objects.values_list('pk', flat=True)),
+            {self.discussed.pk, self.fresh.pk}
+        )
+        self.assertEqual(ArchivedPost.objects.count(), 3)
+        self.assertEqual(
+            ArchivedComment.objects.filter(post=self.old_posts[0].pk).count(),
+            3
+        )
+        self.assertEqual(Comment.objects.count(), 1)
+
+    def test_post_detail_falls_back_to_archive(self):
+        """Страница архивного поста открывается по прежнему адресу."""
+        archive_content()
+        post = self.old_posts[0]
+        url = reverse('posts:post_detail', args=[post.pk])
+        self.client.force_login(self.author)
+        response = self.client.get(url)
+        self.assertEqual(response.context['post'].text, post.text)
+        self.assertEqual(len(response.context['comments']), 2)
+        self.assertContains(response, 'Пост в архиве')
+        self.assertNotContains(response, 'Добавить комментарий')
+        response = self.client.get(
+            reverse('posts:comments', args=[post.pk]),
+            {'before': response.context['next_cursor']}
+        )
+        self.assertEqual(response.json()['next'], None)
+        response = self.client.get(
+            reverse('posts:post_detail', args=[10 ** 6])
+        )
+        self.assertEqual(response.status_code, 404)
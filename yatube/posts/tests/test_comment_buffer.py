@@ -0,0 +1,146 @@
+import fcntl
+import json
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.utils import DatabaseError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.models import Task
+from core.tasks import run_pending
+
+from posts import comment_buffer
+from posts.models import Comment, Post
+
+TEMP_BUFFER_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+
+@override_settings(
+    COMMENT_BUFFER_ENABLED=True,
+    COMMENT_BUFFER_DIR=TEMP_BUFFER_DIR,
+    COMMENT_BUFFER_SIZE=3,
+    COMMENT_BUFFER_MAX_DELAY=60,
+)
+class CommentBufferTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_BUFFER_DIR, ignore_errors=True)
+
+    def setUp(self):
+        comment_buffer.flush()
+        cache.clear()
+        self.client.force_login(self.reader)
+        self.url = reverse('posts:add_comment', args=[self.post.pk])
+        self.detail_url = reverse('posts:post_detail', args=[self.post.pk])
+
+    def test_pending_comment_is_shown_to_author(self):
+        """До записи в базу комментарий виден автору как ожидающий."""
+        self.client.post(self.url, {'text': 'Быстрый ответ'})
+        self.assertFalse(Comment.objects.exists())
+        response = self.client.get(self.detail_url)
+        self.assertEqual(
+            [c.text for c in response.context['pending_comments']],
+            ['Быстрый ответ']
+        )
+        self.assertContains(response, 'ожидает публикации')
+        comment_buffer.flush()
+        response = self.client.get(self.detail_url)
+        self.assertEqual(response.context['pending_comments'], [])
+        self.assertEqual(len(response.context['comments']), 1)
+        self.assertEqual(self.client.session['pending_comments'], [])
+
+    def test_buffer_flushes_in_one_batch(self):
+        """При заполнении буфер пишется пачкой с исходными датами,
+        счётчики поста обновляются."""
+        for number in range(2):
+            self.client.post(self.url, {'text': f'Ответ {number}'})
+        self.assertEqual(Comment.objects.count(), 0)
+        comment_buffer.enqueue(self.post, self.author, 'Третий')
+        self.assertEqual(Comment.objects.count(), 0)
+        self.assertEqual(
+            Task.objects.filter(name=comment_buffer.FLUSH_TASK).count(), 1
+        )
+        run_pending(10)
+        self.assertEqual(Comment.objects.count(), 3)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 3)
+        first = Comment.objects.order_by('pub_date').first()
+        self.assertEqual(first.text, 'Ответ 0')
+
+    def test_comments_to_deleted_posts_are_quarantined(self):
+        """Комментарий к удалённому посту откладывается и не мешает
+        записать остальные; запрос комментария ошибки не получает."""
+        doomed = Post.objects.create(author=self.author, text='Удалят')
+        comment_buffer.enqueue(doomed, self.reader, 'Не успел')
+        doomed.delete()
+        response = self.client.post(self.url, {'text': 'Успел'})
+        self.assertEqual(response.status_code, 302)
+        batch = comment_buffer._rotate(comment_buffer.journal_path())
+        self.assertEqual(comment_buffer._apply(batch), 1)
+        self.assertEqual(
+            list(Comment.objects.values_list('text', flat=True)), ['Успел']
+        )
+        self.assertFalse(os.path.exists(batch))
+        with open(batch + '.rejected', encoding='utf-8') as rejected:
+            self.assertEqual(
+                [json.loads(line)['text'] for line in rejected], ['Не успел']
+            )
+
+    def test_schedule_error_does_not_fail_request(self):
+        """Сбой постановки задачи записи только логируется."""
+        with mock.patch(
+            'posts.comment_buffer.schedule_flush',
+            side_effect=DatabaseError
+        ), self.assertLogs('posts.comment_buffer', 'ERROR'):
+            for number in range(3):
+                response = self.client.post(
+                    self.url, {'text': f'Ответ {number}'}
+                )
+                self.assertEqual(response.status_code, 302)
+
+    def test_replay_skips_saved_comments(self):
+        """Повтор пачки после сбоя не создаёт дублей."""
+        comment_buffer.enqueue(self.post, self.reader, 'Однажды')
+        batch = comment_buffer._rotate(comment_buffer.journal_path())
+        shutil.copy(batch, batch + '.copy')
+        comment_buffer._apply(batch)
+        os.rename(batch + '.copy', batch)
+        os.utime(batch, (0, 0))
+        self.assertEqual(comment_buffer.flush_all(), 1)
+        self.assertEqual(Comment.objects.count(), 1)
+
+    def test_claimed_batch_is_skipped(self):
+        """Пачку, которую пишет другой процесс, flush_all пропускает,
+        а уже записанную и удалённую считает готовой."""
+        comment_buffer.enqueue(self.post, self.reader, 'Один раз')
+        batch = comment_buffer._rotate(comment_buffer.journal_path())
+        os.utime(batch, (0, 0))
+        with open(batch, encoding='utf-8') as other:
+            fcntl.flock(other, fcntl.LOCK_EX)
+            self.assertEqual(comment_buffer.flush_all(), 0)
+            self.assertTrue(os.path.exists(batch))
+        self.assertEqual(comment_buffer._apply(batch), 1)
+        self.assertEqual(comment_buffer._apply(batch), 0)
+        self.assertEqual(Comment.objects.count(), 1)
+
+    @override_settings(COMMENT_BUFFER_FSYNC=True)
+    def test_fsync_setting(self):
+        with mock.patch('posts.comment_buffer.os.fsync') as fsync:
+            comment_buffer.enqueue(self.post, self.reader, 'Надёжно')
+        fsync.assert_called_once()
+        self.assertEqual(comment_buffer.flush(), 1)
@@ -17,8 +17,7 @@ User = get_user_model()
 
 class PostFormTest(TestCase):
     @classmethod
-    def setUpClass(cls):
-        super().setUpClass()
+    def setUpTestData(cls):
         cls.user = User.objects.create_user(username='test_user')
         cls.group = Group.objects.create(
             title='Тест группа',
@@ -176,8 +175,7 @@ class PostFormTest(TestCase):
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
 class PostFormImageTest(TestCase):
     @classmethod
-    def setUpClass(cls):
-        super().setUpClass()
+    def setUpTestData(cls):
         small_gif = (
             b'\x47\x49\x46\x38\x39\x61\x02\x00'
             b'\x01\x00\x80\x00\x00\x00\x00\x00'
@@ -282,8 +280,7 @@ class PostFormImageTest(TestCase):
 
 class CommentFormTests(TestCase):
     @classmethod
-    def setUpClass(cls):
-        super().setUpClass()
+    def setUpTestData(cls):
         cls.user = User.objects.create_user(username='test_user')
         cls.post = Post.objects.create(
             author=cls.user,
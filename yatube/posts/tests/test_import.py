@@ -0,0 +1,121 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from posts.models import Comment, Post
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImportContentTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.source_dir = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        with open(os.path.join(cls.source_dir, 'small.gif'), 'wb') as image:
+            image.write(
+                b'\x47\x49\x46\x38\x39\x61\x01\x00\x01\x00\x00\x00'
+                b'\x00\x21\xF9\x04\x01\x00\x00\x00\x00\x2C\x00\x00'
+                b'\x00\x00\x01\x00\x01\x00\x00\x02\x00\x3B'
+            )
+        cls.existing = User.objects.create_user(username='existing')
+        records = [
+            {'type': 'group', 'slug': 'legacy', 'title': 'Старая группа'},
+            {'type': 'post', 'id': 700, 'author': 'existing',
+             'group': 'legacy', 'text': 'Первый',
+             'pub_date': '2015-03-01T10:00:00+00:00',
+             'image': 'small.gif'},
+            {'type': 'post', 'id': 701, 'author': 'newcomer',
+             'text': 'Второй', 'pub_date': '2015-03-02T10:00:00+00:00'},
+            {'type': 'comment', 'id': 900, 'post': 700, 'author': 'newcomer',
+             'text': 'Ответ', 'pub_date': '2015-03-03T10:00:00+00:00'},
+            {'type': 'comment', 'post': 700, 'author': 'existing',
+             'text': 'Ещё', 'pub_date': '2015-03-04T10:00:00+00:00'},
+        ]
+        cls.path = os.path.join(cls.source_dir, 'data.ndjson')
+        with open(cls.path, 'w', encoding='utf-8') as data:
+            data.writelines(json.dumps(record) + '\n' for record in records)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(cls.source_dir, ignore_errors=True)
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_import(self):
+        """Импорт сохраняет id и даты, находит авторов и группы по имени,
+        копирует картинки и пересчитывает счётчики комментариев."""
+        call_command(
+            'import_content', self.path, media_dir=self.source_dir,
+            batch_size=2, stdout=StringIO()
+        )
+        first = Post.objects.get(pk=700)
+        self.assertEqual(first.author, self.existing)
+        self.assertEqual(first.group.slug, 'legacy')
+        self.assertEqual(first.pub_date.year, 2015)
+        self.assertTrue(first.image.name.startswith('posts/small'))
+        self.assertEqual(first.comment_count, 2)
+        self.assertEqual(first.last_comment_at.day, 4)
+        self.assertTrue(Comment.objects.filter(pk=900).exists())
+        self.assertFalse(
+            Post.objects.get(pk=701).author.has_usable_password()
+        )
+        self.assertEqual(
+            Comment.objects.get(text='Ещё').pub_date.isoformat(),
+            '2015-03-04T10:00:00+00:00'
+        )
+
+    def test_dates_with_offset_are_stored_in_utc(self):
+        """Дата со смещением сохраняется как тот же момент в UTC
+        и находится сравнением и точным совпадением."""
+        path = os.path.join(self.source_dir, 'offset.ndjson')
+        with open(path, 'w', encoding='utf-8') as data:
+            data.write(json.dumps({
+                'type': 'post', 'id': 801, 'author': 'existing',
+                'text': 'Москва', 'pub_date': '2020-01-01T10:00:00+03:00',
+            }) + '\n')
+        call_command('import_content', path, stdout=StringIO())
+        moment = datetime(2020, 1, 1, 7, tzinfo=timezone.utc)
+        self.assertTrue(Post.objects.filter(
+            pk=801, pub_date__lt=moment + timedelta(hours=1)
+        ).exists())
+        self.assertTrue(
+            Post.objects.filter(pk=801, pub_date=moment).exists()
+        )
+
+    def test_missing_image_is_skipped(self):
+        """Отсутствующая картинка не прерывает импорт."""
+        path = os.path.join(self.source_dir, 'lost.ndjson')
+        with open(path, 'w', encoding='utf-8') as data:
+            data.write(json.dumps({
+                'type': 'post', 'id': 800, 'author': 'existing',
+                'text': 'Без картинки', 'image': 'lost.gif',
+                'pub_date': '2015-03-05T10:00:00+00:00',
+            }) + '\n')
+        with self.assertLogs('posts.importer', 'WARNING'):
+            call_command(
+                'import_content', path, media_dir=self.source_dir,
+                stdout=StringIO()
+            )
+        self.assertEqual(Post.objects.get(pk=800).image, '')
+
+    def test_bad_record(self):
+        """Неизвестный тип записи останавливает импорт с номером строки."""
+        path = os.path.join(self.source_dir, 'bad.ndjson')
+        with open(path, 'w', encoding='utf-8') as data:
+            data.write('\n{"type": "user"}\n')
+        with self.assertRaisesMessage(CommandError, 'строка 2'):
+            call_command('import_content', path, stdout=StringIO())
@@ -1,13 +1,15 @@
+from unittest import mock
+
 from django.conf import settings
-from django.test import Client, TestCase
+from django.template.defaultfilters import linebreaks_filter
+from django.test import Client, TestCase, override_settings
 
 from posts.models import Comment, Follow, Group, Post, User
 
 
 class PostModelTest(TestCase):
     @classmethod
-    def setUpClass(cls):
-        super().setUpClass()
+    def setUpTestData(cls):
         cls.client = Client()
         cls.user = User.objects.create_user(username='test_user')
         cls.client.force_login(cls.user)
@@ -54,8 +56,7 @@ class PostModelTest(TestCase):
 
 class GroupModelTest(TestCase):
     @classmethod
-    def setUpClass(cls):
-        super().setUpClass()
+    def setUpTestData(cls):
         cls.group = Group.objects.create(
             title='Тестовая группаТестовая группаТестовая группа',
             description='Тестовое описание',
@@ -85,8 +86,7 @@ class GroupModelTest(TestCase):
 
 class CommentModelTest(TestCase):
     @classmethod
-    def setUpClass(cls):
-        super().setUpClass()
+    def setUpTestData(cls):
         cls.user = User.objects.create_user(username='auth')
         cls.post = Post.objects.create(
             author=cls.user,
@@ -118,11 +118,15 @@ class CommentModelTest(TestCase):
                     comment._meta.get_field(value).verbose_name, expected
                 )
 
+    def test_text_html_comment(self):
+        """text_html совпадает с результатом фильтра linebreaks."""
+        comment = CommentModelTest.comment
+        self.assertEqual(comment.text_html, linebreaks_filter(comment.text))
+
 
 class FollowModelTest(TestCase):
     @classmethod
-    def setUpClass(cls):
-        super().setUpClass()
+    def setUpTestData(cls):
         cls.user = User.objects.create_user(username='auth')
         cls.author = User.objects.create_user(username='Author')
         cls.follow = Follow.objects.create(author=cls.author, user=cls.user)
@@ -149,8 +153,7 @@ class FollowModelTest(TestCase):
 
 class PostModelTest(TestCase):
     @classmethod
-    def setUpClass(cls):
-        super().setUpClass()
+    def setUpTestData(cls):
         cls.user = User.objects.create_user(username='auth')
         cls.post = Post.objects.create(
             author=cls.user,
@@ -161,3 +164,20 @@ class PostModelTest(TestCase):
         post = PostModelTest.post
         expected_text = post.text[:15]
         self.assertEqual(str(post), expected_text)
+
+    def test_short_text_html_is_not_cached(self):
+        """Короткий текст размечается без обращения к кешу."""
+        post = PostModelTest.post
+        with mock.patch('posts.models.cache') as text_cache:
+            self.assertEqual(post.text_html, linebreaks_filter(post.text))
+        text_cache.get.assert_not_called()
+
+    @override_settings(TEXT_CACHE_MIN_LENGTH=0)
+    def test_text_html_follows_edit(self):
+        """После правки поста text_html отдаёт новый текст."""
+        post = PostModelTest.post
+        self.assertEqual(post.text_html, linebreaks_filter(post.text))
+        post.text = 'Отредактированный <b>пост</b>\n\nВторой абзац'
+        post.save()
+        self.assertEqual(post.text_html, linebreaks_filter(post.text))
+        self.assertIn('&lt;b&gt;', post.text_html)
@@ -0,0 +1,117 @@
+import json
+import re
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from core.models import Task
+from core.tasks import run_pending
+
+from posts import follow_graph
+from posts.moderation import delete_posts, delete_user_content
+from posts.models import Comment, Follow, Group, Post
+
+from .factories import CommentFactory, PostFactory
+
+User = get_user_model()
+
+
+@override_settings(BULK_BATCH_SIZE=2)
+class ModerationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@ya.ru', password='admin-pass'
+        )
+        cls.spammer = User.objects.create_user(username='spammer')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.posts = PostFactory.create_batch(
+            5, author=cls.spammer, text=lambda number: f'Спам {number}'
+        )
+        cls.reader_post = Post.objects.create(
+            author=cls.reader, text='Честный пост'
+        )
+        for post in (cls.posts[0], cls.reader_post):
+            CommentFactory.create_batch(
+                3, post=post, author=cls.spammer, text='Спам'
+            )
+        Comment.objects.create(
+            post=cls.reader_post, author=cls.reader, text='Ответ'
+        )
+        Follow.objects.create(user=cls.spammer, author=cls.reader)
+        Follow.objects.create(user=cls.reader, author=cls.spammer)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def run_action(self, model, action, objects, **data):
+        return self.client.post(f'/admin/posts/{model}/', {
+            'action': action,
+            '_selected_action': [obj.pk for obj in objects],
+            **data,
+        }, follow=True)
+
+    def test_delete_posts(self):
+        """Посты удаляются пачками вместе с комментариями."""
+        self.run_action('post', 'delete_posts', self.posts)
+        self.assertFalse(Post.objects.filter(author=self.spammer).exists())
+        self.assertEqual(Comment.objects.count(), 4)
+
+    def test_reassign_group(self):
+        """Посты переносятся в группу из формы действия."""
+        self.run_action(
+            'post', 'reassign_group', self.posts, group=self.group.pk
+        )
+        self.assertEqual(
+            Post.objects.filter(group=self.group).count(), len(self.posts)
+        )
+        self.run_action('post', 'reassign_group', self.posts, group='')
+        self.assertFalse(Post.objects.filter(group=self.group).exists())
+
+    def test_delete_comments_refreshes_counters(self):
+        """Удаление комментариев пересчитывает счётчики постов."""
+        spam = Comment.objects.filter(
+            post=self.reader_post, author=self.spammer
+        )
+        self.run_action('comment', 'delete_comments', spam)
+        self.reader_post.refresh_from_db()
+        self.assertEqual(self.reader_post.comment_count, 1)
+
+    def test_delete_user_content(self):
+        """Удаляются комментарии, посты и подписки пользователя."""
+        follow_graph.following_ids(self.reader.id)
+        result = delete_user_content([self.spammer.id])
+        self.assertEqual(
+            result, {'comments': 6, 'posts': 5, 'follows': 2}
+        )
+        self.assertEqual(list(follow_graph.following_ids(self.reader.id)), [])
+        self.reader_post.refresh_from_db()
+        self.assertEqual(self.reader_post.comment_count, 1)
+        self.assertTrue(User.objects.filter(pk=self.spammer.pk).exists())
+
+    def test_selection_is_queried_in_chunks(self):
+        """Ни один запрос не получает больше BULK_BATCH_SIZE id."""
+        with CaptureQueriesContext(connection) as queries:
+            delete_posts([post.pk for post in self.posts])
+        self.assertFalse(Post.objects.filter(author=self.spammer).exists())
+        self.assertLessEqual(max(
+            len(values.split(','))
+            for query in queries
+            for values in re.findall(r' IN \(([^()]*)\)', query['sql'])
+        ), 2)
+
+    @override_settings(MODERATION_SYNC_LIMIT=1)
+    def test_large_selection_runs_in_background(self):
+        """Большая выборка обрабатывается фоновыми задачами по пачкам."""
+        self.run_action('post', 'delete_posts', self.posts)
+        self.assertEqual(Post.objects.filter(author=self.spammer).count(), 5)
+        self.assertEqual(
+            [len(json.loads(task.payload)['args'][1])
+             for task in Task.objects.order_by('pk')],
+            [2, 2, 1]
+        )
+        run_pending(10)
+        self.assertFalse(Post.objects.filter(author=self.spammer).exists())
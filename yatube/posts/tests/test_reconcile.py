@@ -0,0 +1,67 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from posts import follow_graph
+from posts.models import Follow, FollowSuggestion, Post
+from posts.reconcile import reconcile
+
+from .factories import CommentFactory, PostFactory
+
+User = get_user_model()
+
+
+@override_settings(BULK_BATCH_SIZE=2)
+class ReconcileTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.posts = PostFactory.create_batch(5, author=cls.author)
+        CommentFactory.create_batch(
+            3, post=lambda number: cls.posts[number], author=cls.reader,
+            text='Да'
+        )
+
+    def test_post_counters_are_repaired(self):
+        """Разошедшиеся счётчики находятся и чинятся, скан продолжается
+        с последнего id."""
+        Post.objects.filter(pk=self.posts[1].pk).update(comment_count=7)
+        Post.objects.filter(pk=self.posts[4].pk).update(
+            comment_count=2, last_comment_at=timezone.now()
+        )
+        result = reconcile('post_counters', repair=False)
+        self.assertEqual(result['drifted'], 2)
+        result = reconcile('post_counters', limit=3)
+        self.assertEqual(
+            result, {'scanned': 3, 'drifted': 1, 'last': self.posts[2].pk}
+        )
+        result = reconcile('post_counters', after=result['last'])
+        self.assertEqual(result['drifted'], 1)
+        self.assertEqual(reconcile('post_counters')['drifted'], 0)
+        self.posts[4].refresh_from_db()
+        self.assertEqual(self.posts[4].comment_count, 0)
+        self.assertIsNone(self.posts[4].last_comment_at)
+
+    def test_stale_follow_cache_is_dropped(self):
+        """Устаревший кеш графа подписок удаляется."""
+        cache.clear()
+        self.assertEqual(list(follow_graph.following_ids(self.reader.id)), [])
+        Follow.objects.bulk_create(
+            [Follow(user=self.reader, author=self.author)]
+        )
+        self.assertEqual(reconcile('follow_cache')['drifted'], 1)
+        self.assertEqual(
+            list(follow_graph.following_ids(self.reader.id)),
+            [self.author.id]
+        )
+
+    def test_suggestions_of_followed_authors_are_removed(self):
+        """Рекомендации уже подписанных авторов удаляются."""
+        FollowSuggestion.objects.create(
+            user=self.reader, author=self.author, score=1
+        )
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(reconcile('suggestions')['drifted'], 1)
+        self.assertFalse(FollowSuggestion.objects.exists())
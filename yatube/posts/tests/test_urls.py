@@ -2,7 +2,9 @@ from http import HTTPStatus
 
 from django.contrib.auth import get_user_model
 from django.test import Client, TestCase
+from django.urls import NoReverseMatch, reverse
 
+from posts.fast_urls import build_url
 from posts.models import Group, Post
 
 User = get_user_model()
@@ -10,8 +12,7 @@ User = get_user_model()
 
 class StaticURLTests(TestCase):
     @classmethod
-    def setUpClass(cls):
-        super().setUpClass()
+    def setUpTestData(cls):
         cls.author = User.objects.create_user(username='test_author')
         cls.user = User.objects.create_user(username='test_user')
         cls.group = Group.objects.create(
@@ -107,3 +108,43 @@ class StaticURLTests(TestCase):
             with self.subTest(reverse_name=reverse_name):
                 response = self.authorized_author.get(reverse_name)
                 self.assertTemplateUsed(response, template)
+
+
+class FastURLTests(TestCase):
+    def test_build_url_matches_reverse(self):
+        """build_url совпадает с reverse() для горячих маршрутов."""
+        cases = {
+            'posts:profile': {'username': 'Пользователь @1+2'},
+            'posts:post_detail': {'post_id': 42},
+            'posts:group_list': {'slug': 'test-slug_1'},
+        }
+        for name, kwargs in cases.items():
+            with self.subTest(name=name):
+                value, = kwargs.values()
+                self.assertEqual(
+                    build_url(name, value), reverse(name, kwargs=kwargs)
+                )
+
+    def test_build_url_rejects_invalid_value(self):
+        """Недопустимое значение не подставляется в адрес."""
+        invalid = {
+            'posts:profile': 'a/b',
+            'posts:post_detail': '-1',
+            'posts:group_list': 'не slug',
+        }
+        for name, value in invalid.items():
+            with self.subTest(name=name):
+                with self.assertRaises(NoReverseMatch):
+                    build_url(name, value)
+
+    def test_get_absolute_url(self):
+        """get_absolute_url ведёт на страницы поста и группы."""
+        author = User.objects.create_user(username='test_author')
+        group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        post = Post.objects.create(author=author, text='Тест', group=group)
+        self.assertEqual(post.get_absolute_url(), f'/posts/{post.pk}/')
+        self.assertEqual(group.get_absolute_url(), f'/group/{group.slug}/')
@@ -1,16 +1,38 @@
 import shutil
 import tempfile
+from datetime import timedelta
+from io import StringIO
 
 from django import forms
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.db.utils import IntegrityError
-from django.test import Client, TestCase, override_settings
+from django.db import connection, transaction
+from django.db.utils import DatabaseError, IntegrityError
+from django.test import (
+    Client, TestCase, TransactionTestCase, override_settings
+)
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
-
-from posts.models import Comment, Follow, Group, Post
+from django.utils import timezone
+
+from posts import follow_graph
+from posts.management.commands.warm_cache import hot_urls
+from posts.page_separation import EstimatedCountPaginator
+from posts.reconcile import reconcile
+from posts.models import (
+    Comment, Follow, FollowSuggestion, Group, Post, TrendingGroup,
+    TrendingPost
+)
+from posts.suggestions import compute_suggestions
+from posts.trending import compute_trending
+
+from .factories import (
+    CommentFactory, GroupFactory, PostFactory, UserFactory
+)
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
@@ -18,28 +40,17 @@ User = get_user_model()
 
 
 class PostPagesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory.create(username='test_user')
+        cls.group = GroupFactory.create(title='Тест', slug='12')
+        cls.post, cls.new_post = PostFactory.create_batch(
+            2, text='Тестовый текст', author=cls.user, group=cls.group
+        )
+
     def setUp(self):
-        self.user = User.objects.create_user(username='test_user')
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
-        self.group = Group.objects.create(
-            title='Тест',
-            slug='12',
-        )
-        self.post = Post.objects.create(
-            text='Тестовый текст',
-            author=self.user,
-            group=self.group,
-        )
-        self.form_data = {
-            'text': self.post.text,
-            'group': self.group.id,
-        }
-        self.new_post = self.authorized_client.post(
-            reverse('posts:post_create'),
-            data=self.form_data,
-            follow=True
-        )
 
     def test_pages_use_correct_template(self):
         """URL-адрес использует соответствующий шаблон."""
@@ -136,21 +147,19 @@ class PostPagesTests(TestCase):
 
 class PaginatorTests(TestCase):
     @classmethod
-    def setUpClass(cls):
-        super().setUpClass()
+    def setUpTestData(cls):
         cls.user = User.objects.create_user(username='test_user')
         cls.group = Group.objects.create(
             title='Тестовая группа',
             slug='test-slug',
             description='Тестовая группа',
         )
-        cls.post = settings.LIMIT + settings.POST_NUMBER
-        for cls.post in range(settings.LIMIT + settings.POST_NUMBER):
-            cls.post = Post.objects.create(
-                text='Тестовый текст',
-                author=cls.user,
-                group=cls.group
-            )
+        PostFactory.create_batch(
+            settings.LIMIT + settings.POST_NUMBER,
+            text='Тестовый текст',
+            author=cls.user,
+            group=cls.group
+        )
 
     def test_firsten_records(self):
         """Проверка паджинатора 10 постов на 1 странице."""
@@ -192,8 +201,7 @@ class PaginatorTests(TestCase):
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
 class PostImageExistTest(TestCase):
     @classmethod
-    def setUpClass(cls):
-        super().setUpClass()
+    def setUpTestData(cls):
         small_gif = (
             b'\x47\x49\x46\x38\x39\x61\x02\x00'
             b'\x01\x00\x80\x00\x00\x00\x00\x00'
@@ -265,8 +273,7 @@ class PostImageExistTest(TestCase):
 
 class FollowTest(TestCase):
     @classmethod
-    def setUpClass(cls):
-        super().setUpClass()
+    def setUpTestData(cls):
         cls.follower = User.objects.create_user(username='follower')
         cls.follower_client = Client()
         cls.follower_client.force_login(cls.follower)
@@ -343,6 +350,72 @@ class FollowTest(TestCase):
             ).save()
         self.assertTrue('CHECK constraint failed' in str(context.exception))
 
+    def test_follow_graph_tracks_changes(self):
+        """Индекс подписок обновляется при подписке и отписке."""
+        self.assertTrue(
+            follow_graph.is_following(self.follower.id, self.author.id)
+        )
+        self.assertEqual(
+            list(follow_graph.follower_ids(self.author.id)),
+            [self.follower.id]
+        )
+        self.follower_client.get(reverse(
+            'posts:profile_unfollow',
+            kwargs={'username': self.author.username}))
+        self.assertFalse(
+            follow_graph.is_following(self.follower.id, self.author.id)
+        )
+        self.assertEqual(
+            len(follow_graph.follower_ids(self.author.id)),
+            settings.ZERO_VALUE
+        )
+
+    def test_follow_counters_context(self):
+        """Счётчики подписок передаются в профиль автора."""
+        response = self.follower_client.get(reverse(
+            'posts:profile', kwargs={'username': self.author.username}))
+        self.assertEqual(response.context['followers_count'], 1)
+        self.assertEqual(
+            response.context['following_count'], settings.ZERO_VALUE
+        )
+        self.assertTrue(response.context['following'])
+
+    def test_bulk_follow(self):
+        """Массовая подписка пропускает себя, дубли и неизвестных."""
+        other = User.objects.create_user(username='other')
+        response = self.follower_client.post(
+            reverse('posts:bulk_follow'),
+            {'usernames': 'author, other follower ghost'}
+        )
+        self.assertEqual(
+            response.json(), {'followed': 1, 'missing': ['ghost']}
+        )
+        self.assertTrue(follow_graph.is_following(self.follower.id, other.id))
+        self.assertEqual(
+            Follow.objects.filter(user=self.follower).count(), 2
+        )
+        response = self.follower_client.post(
+            reverse('posts:bulk_follow'),
+            {'usernames': 'author other', 'unfollow': True}
+        )
+        self.assertEqual(response.json(), {'unfollowed': 2, 'missing': []})
+        self.assertFalse(
+            Follow.objects.filter(user=self.follower).exists()
+        )
+
+    def test_follow_index_queries_do_not_grow(self):
+        """Число запросов ленты подписок не зависит от числа постов."""
+        url = reverse('posts:follow_index')
+        self.follower_client.get(url)
+        with CaptureQueriesContext(connection) as one_post:
+            self.follower_client.get(url)
+        group = Group.objects.create(title='Группа', slug='group')
+        for _ in range(settings.POST_NUMBER):
+            Post.objects.create(author=self.author, text='Ещё', group=group)
+        with CaptureQueriesContext(connection) as more_posts:
+            self.follower_client.get(url)
+        self.assertEqual(len(more_posts), len(one_post))
+
     def test_follow_index_context(self):
         """Пост автора появляется в ленте у подписчика."""
         response = self.follower_client.get(reverse('posts:follow_index'))
@@ -364,10 +437,25 @@ class FollowTest(TestCase):
         )
 
 
+class FollowGraphCommitTest(TransactionTestCase):
+    def test_graph_is_invalidated_after_commit(self):
+        """Массив, закешированный до коммита подписки, сбрасывается."""
+        author = User.objects.create_user(username='author')
+        reader = User.objects.create_user(username='reader')
+        cache.clear()
+        with transaction.atomic():
+            Follow.objects.create(user=reader, author=author)
+            # Так его закешировал бы параллельный запрос до коммита.
+            cache.set(
+                follow_graph.cache_key(follow_graph.FOLLOWING, reader.id),
+                b''
+            )
+        self.assertTrue(follow_graph.is_following(reader.id, author.id))
+
+
 class CommentTest(TestCase):
     @classmethod
-    def setUpClass(cls):
-        super().setUpClass()
+    def setUpTestData(cls):
         cls.author = User.objects.create_user(username='author')
         cls.commentator = User.objects.create_user(username='commentator')
         cls.commentator_client = Client()
@@ -409,10 +497,87 @@ class CommentTest(TestCase):
                 self.assertEqual(fields, values)
 
 
+@override_settings(COMMENTS_LIMIT=2)
+class CommentPaginationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(
+            text='Тестовый текст поста',
+            author=cls.author
+        )
+        now = timezone.now()
+        cls.comments = CommentFactory.create_batch(
+            5,
+            post=cls.post,
+            author=cls.author,
+            text=lambda number: f'Комментарий {number}',
+            pub_date=lambda number: now + timedelta(seconds=number),
+        )
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def test_comments_cursor_pages(self):
+        """Комментарии отдаются страницами от новых к старым."""
+        newest_first = Comment.objects.filter(post=self.post)
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.post.id])
+        )
+        self.assertEqual(response.context['comments'], list(newest_first[:2]))
+        cursor = response.context['next_cursor']
+        seen = response.context['comments']
+        url = reverse('posts:comments', args=[self.post.id])
+        while cursor:
+            data = self.client.get(url, {'before': cursor}).json()
+            response = self.client.get(
+                reverse('posts:post_detail', args=[self.post.id]),
+                {'before': cursor}
+            )
+            for comment in response.context['comments']:
+                self.assertIn(comment.text, data['html'])
+            seen += response.context['comments']
+            cursor = data['next']
+            self.assertEqual(cursor, response.context['next_cursor'])
+        self.assertEqual(seen, list(newest_first))
+
+    def test_broken_cursor_serves_first_page(self):
+        """Испорченный или слишком большой курсор даёт первую страницу."""
+        first = list(Comment.objects.filter(post=self.post)[:2])
+        for cursor in ('abc', '1.2.3', '99999999999999999999.1'):
+            with self.subTest(cursor=cursor):
+                response = self.client.get(
+                    reverse('posts:post_detail', args=[self.post.id]),
+                    {'before': cursor}
+                )
+                self.assertEqual(response.context['comments'], first)
+                response = self.client.get(
+                    reverse('posts:comments', args=[self.post.id]),
+                    {'before': cursor}
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_add_comment_ajax(self):
+        """XHR-запрос получает только фрагмент нового комментария."""
+        response = self.author_client.post(
+            reverse('posts:add_comment', args=[self.post.id]),
+            {'text': 'Новый комментарий'},
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertIn('Новый комментарий', response.json()['html'])
+        response = self.author_client.post(
+            reverse('posts:add_comment', args=[self.post.id]),
+            {'text': ''},
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest'
+        )
+        self.assertEqual(response.status_code, 400)
+
+
 class CacheTest(TestCase):
     @classmethod
-    def setUpClass(cls):
-        super().setUpClass()
+    def setUpTestData(cls):
         cls.author = User.objects.create_user(username='author')
         cls.author_client = Client()
         cls.post = Post.objects.create(
@@ -430,3 +595,364 @@ class CacheTest(TestCase):
         cache.clear()
         posts_count = Post.objects.count()
         self.assertEqual(len(response.context['page_obj']), posts_count)
+
+
+class WarmCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        Group.objects.create(title='Пустая', slug='empty')
+        Post.objects.create(author=cls.author, text='Текст', group=cls.group)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def test_hot_urls(self):
+        """Прогреваются первые страницы лент самых популярных групп
+        и авторов."""
+        self.assertEqual(hot_urls(2, 1, 1), [
+            ('index', '/?page=1'),
+            ('index', '/?page=2'),
+            ('group_posts', '/group/group/?page=1'),
+            ('group_posts', '/group/group/?page=2'),
+            ('profile', '/profile/author/?page=1'),
+            ('profile', '/profile/author/?page=2'),
+        ])
+
+    def test_refuses_process_local_cache(self):
+        """Без --base-url команда не прогревает LocMemCache своего
+        процесса."""
+        with self.assertRaisesMessage(CommandError, '--base-url'):
+            call_command('warm_cache', stdout=StringIO())
+
+
+class SessionTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author,
+            text='Тестовый текст',
+            group=cls.group,
+        )
+        cls.feed_urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[cls.group.slug]),
+            reverse('posts:profile', args=[cls.author.username]),
+            reverse('posts:post_detail', args=[cls.post.id]),
+        ]
+
+    def assertNoSessionQueries(self, client, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+        for query in queries.captured_queries:
+            self.assertNotIn('django_session', query['sql'])
+        return response
+
+    def test_anonymous_feed_is_session_less(self):
+        """Анонимные ленты не трогают сессию, CSRF и сообщения."""
+        for url in self.feed_urls:
+            with self.subTest(url=url):
+                response = self.assertNoSessionQueries(self.client, url)
+                self.assertEqual(len(response.cookies), settings.ZERO_VALUE)
+                self.assertNotContains(response, 'csrfmiddlewaretoken')
+
+    def test_authorized_session_is_cached(self):
+        """Сессия авторизованного читается из кеша, а не из БД."""
+        client = Client()
+        client.force_login(self.author)
+        for url in self.feed_urls:
+            with self.subTest(url=url):
+                self.assertNoSessionQueries(client, url)
+
+
+class SuggestionTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='user')
+        cls.friend = User.objects.create_user(username='friend')
+        cls.friend_of_friend = User.objects.create_user(username='fof')
+        cls.stranger = User.objects.create_user(username='stranger')
+        Follow.objects.create(user=cls.user, author=cls.friend)
+        Follow.objects.create(user=cls.friend, author=cls.friend_of_friend)
+        Follow.objects.create(user=cls.friend, author=cls.user)
+
+    def setUp(self):
+        self.user_client = Client()
+        self.user_client.force_login(self.user)
+
+    def test_compute_suggestions(self):
+        """Рекомендуются друзья друзей, но не себя и не подписки."""
+        compute_suggestions()
+        authors = FollowSuggestion.objects.filter(
+            user=self.user
+        ).values_list('author', flat=True)
+        self.assertEqual(list(authors), [self.friend_of_friend.id])
+
+    def test_follow_index_shows_suggestions(self):
+        """Рекомендации выводятся в ленте подписок."""
+        compute_suggestions()
+        response = self.user_client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            response.context['suggestions'], [self.friend_of_friend]
+        )
+        Follow.objects.create(user=self.user, author=self.friend_of_friend)
+        response = self.user_client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.context['suggestions'], [])
+
+
+class CommentStatsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.commentator = User.objects.create_user(username='commentator')
+        cls.quiet_post = Post.objects.create(
+            author=cls.author, text='Пост без комментариев'
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, text='Обсуждаемый пост'
+        )
+
+    def setUp(self):
+        self.commentator_client = Client()
+        self.commentator_client.force_login(self.commentator)
+
+    def test_comment_stats_follow_comments(self):
+        """Счётчик и дата комментариев обновляются при добавлении."""
+        self.commentator_client.post(
+            reverse('posts:add_comment', args=[self.post.id]),
+            {'text': 'Первый'}
+        )
+        second = Comment.objects.create(
+            post=self.post, author=self.author, text='Второй'
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 2)
+        self.assertEqual(self.post.last_comment_at, second.pub_date)
+
+    def test_older_comment_keeps_last_comment_at(self):
+        """Комментарий со старой датой не сдвигает last_comment_at назад."""
+        now = timezone.now()
+        for minutes in (0, -5):
+            Comment(
+                post=self.post, author=self.author, text='Из буфера',
+                pub_date=now + timedelta(minutes=minutes),
+            ).save_base(raw=True)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 2)
+        self.assertEqual(self.post.last_comment_at, now)
+
+    def test_discussed_feed(self):
+        """В обсуждаемом только посты с комментариями."""
+        Comment.objects.create(
+            post=self.post, author=self.commentator, text='Комментарий'
+        )
+        response = self.client.get(reverse('posts:discussed'))
+        self.assertTemplateUsed(response, 'posts/discussed.html')
+        self.assertEqual(list(response.context['page_obj']), [self.post])
+        self.assertContains(response, 'Комментариев: 1')
+
+
+class CommentDeleteStatsTest(TransactionTestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.post = Post.objects.create(author=self.author, text='Пост')
+
+    def test_comment_delete_refreshes_stats(self):
+        """После удаления комментария счётчик и дата пересчитываются."""
+        first = Comment.objects.create(
+            post=self.post, author=self.author, text='Первый'
+        )
+        second = Comment.objects.create(
+            post=self.post, author=self.author, text='Второй'
+        )
+        second.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+        self.assertEqual(self.post.last_comment_at, first.pub_date)
+
+    def test_bulk_delete_refreshes_once(self):
+        """Удаление пачки комментариев и каскад поста дают один
+        пересчёт после коммита, а откат не оставляет лишнего."""
+        CommentFactory.create_batch(5, post=self.post, author=self.author)
+        with CaptureQueriesContext(connection) as queries:
+            Comment.objects.filter(pk__in=[
+                comment.pk for comment in Comment.objects.all()[:2]
+            ]).delete()
+        self.assertEqual(len([
+            query for query in queries if query['sql'].startswith('UPDATE')
+        ]), 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 3)
+        with CaptureQueriesContext(connection) as queries:
+            self.post.delete()
+        self.assertEqual(len([
+            query for query in queries if query['sql'].startswith('UPDATE')
+        ]), 1)
+        self.assertFalse(Comment.objects.exists())
+
+    def test_rolled_back_delete_keeps_refreshing(self):
+        """После отката удаления поста счётчики его комментариев
+        снова пересчитываются."""
+        comments = CommentFactory.create_batch(
+            2, post=self.post, author=self.author
+        )
+        post_id = self.post.pk
+        with self.assertRaises(DatabaseError), transaction.atomic():
+            self.post.delete()
+            raise DatabaseError
+        comments[0].delete()
+        self.assertEqual(Post.objects.get(pk=post_id).comment_count, 1)
+
+
+class TrendingTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.quiet = Group.objects.create(title='Тихая', slug='quiet')
+        cls.busy = Group.objects.create(title='Шумная', slug='busy')
+        cls.old_post = Post.objects.create(
+            author=cls.author, text='Старое обсуждение', group=cls.quiet
+        )
+        cls.new_post = Post.objects.create(
+            author=cls.author, text='Свежее обсуждение', group=cls.busy
+        )
+        Post.objects.create(author=cls.author, text='Ещё', group=cls.busy)
+        CommentFactory.create_batch(
+            3, post=cls.old_post, author=cls.author, text='Было',
+            pub_date=timezone.now() - timedelta(hours=30),
+        )
+        CommentFactory.create_batch(
+            2, post=cls.new_post, author=cls.author, text='Стало'
+        )
+
+    def test_recent_activity_outweighs_old(self):
+        """Два свежих комментария весят больше трёх суточной давности."""
+        compute_trending()
+        self.assertEqual(
+            [trending.post for trending in TrendingPost.objects.all()],
+            [self.new_post, self.old_post]
+        )
+        self.assertEqual(
+            [trending.group for trending in TrendingGroup.objects.all()],
+            [self.busy, self.quiet]
+        )
+
+    def test_index_reads_precomputed_rankings(self):
+        """Главная показывает готовый рейтинг, не пересчитывая его."""
+        compute_trending()
+        cache.clear()
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Популярные посты')
+        self.assertEqual(
+            [t.post for t in response.context['trending_posts']],
+            [self.new_post, self.old_post]
+        )
+
+
+class AdminChangelistTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@ya.ru', password='admin-pass'
+        )
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.posts = PostFactory.create_batch(
+            5, author=cls.admin, group=cls.group,
+            text=lambda number: f'Пост {number}',
+        )
+        CommentFactory.create_batch(
+            5, post=cls.posts[0], author=cls.admin, text='Коммент'
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        """Число запросов списка в админке не зависит от числа строк."""
+        for url in ('/admin/posts/post/', '/admin/posts/comment/'):
+            with self.subTest(url=url):
+                self.client.get(url)
+                with CaptureQueriesContext(connection) as few:
+                    self.client.get(url)
+                Post.objects.bulk_create(
+                    Post(author=self.admin, text='Ещё', group=self.group)
+                    for _ in range(5)
+                )
+                Comment.objects.bulk_create(
+                    Comment(post=self.posts[1], author=self.admin, text='Ещё')
+                    for _ in range(5)
+                )
+                with CaptureQueriesContext(connection) as many:
+                    self.client.get(url)
+                self.assertEqual(len(many), len(few))
+
+    def test_search_by_author_username(self):
+        """Комментарии ищутся по точному имени автора."""
+        response = self.client.get('/admin/posts/comment/', {'q': 'admin'})
+        self.assertEqual(response.context['cl'].result_count, 5)
+
+    def test_post_text_search_is_opt_in(self):
+        """По тексту посты ищутся только с включённым фильтром."""
+        url = '/admin/posts/post/'
+        response = self.client.get(url, {'q': 'Пост 1'})
+        self.assertEqual(response.context['cl'].result_count, 0)
+        response = self.client.get(url, {'q': 'Пост 1', 'in_text': '1'})
+        self.assertEqual(response.context['cl'].result_count, 1)
+        response = self.client.get(url, {'q': 'admin'})
+        self.assertEqual(response.context['cl'].result_count, 5)
+
+    @override_settings(EXACT_COUNT_LIMIT=0)
+    def test_estimated_count(self):
+        """Без фильтров большая таблица не считается через COUNT(*)."""
+        Post.objects.filter(pk=self.posts[0].pk).delete()
+        paginator = EstimatedCountPaginator(Post.objects.all(), 2)
+        self.assertEqual(paginator.count, self.posts[-1].pk)
+        filtered = EstimatedCountPaginator(
+            Post.objects.filter(group=self.group), 2
+        )
+        self.assertEqual(filtered.count, 4)
+
+
+class LargeDatasetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.authors = UserFactory.create_batch(20)
+        cls.groups = GroupFactory.create_batch(5)
+        cls.posts = PostFactory.create_batch(
+            1000,
+            author=lambda number: cls.authors[number % 20],
+            group=lambda number: cls.groups[number % 5],
+        )
+        CommentFactory.create_batch(
+            3000,
+            post=lambda number: cls.posts[number % 100],
+            author=lambda number: cls.authors[number % 20],
+        )
+
+    def test_batch_keeps_ids_and_counters(self):
+        """Пачки получают id, а счётчики постов сходятся с комментариями."""
+        self.assertEqual(
+            [post.pk for post in self.posts],
+            list(Post.objects.order_by('pk').values_list('pk', flat=True))
+        )
+        self.assertEqual(reconcile('post_counters')['drifted'], 0)
+        self.assertEqual(
+            Post.objects.get(pk=self.posts[0].pk).comment_count, 30
+        )
+
+    def test_last_page_of_large_group(self):
+        last_page = 200 // settings.LIMIT
+        response = self.client.get(
+            reverse('posts:group_list', args=[self.groups[0].slug]),
+            {'page': last_page}
+        )
+        page = response.context['page_obj']
+        self.assertEqual(page.number, last_page)
+        self.assertEqual(len(page), settings.LIMIT)
+        self.assertFalse(page.has_next())
@@ -0,0 +1,50 @@
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Comment, Post, TrendingGroup, TrendingPost
+
+
+def decayed_counts(rows, now):
+    """Сумма весов событий по ключу; вес события вдвое меньше
+    каждые TRENDING_HALF_LIFE часов."""
+    half_life = settings.TRENDING_HALF_LIFE * 3600
+    scores = Counter()
+    for key, happened in rows:
+        age = (now - happened).total_seconds()
+        scores[key] += 0.5 ** (age / half_life)
+    return scores
+
+
+def compute_trending(now=None):
+    """Пересчитывает популярные посты (по свежим комментариям)
+    и группы (по свежим постам) за последние TRENDING_WINDOW часов."""
+    now = now or timezone.now()
+    since = now - timedelta(hours=settings.TRENDING_WINDOW)
+    comments = Comment.objects.filter(
+        pub_date__gte=since
+    ).order_by().values_list('post_id', 'pub_date')
+    posts = Post.objects.filter(
+        pub_date__gte=since, group__isnull=False
+    ).order_by().values_list('group_id', 'pub_date')
+    trending_posts = [
+        TrendingPost(post_id=post_id, score=score)
+        for post_id, score in decayed_counts(
+            comments.iterator(), now
+        ).most_common(settings.TRENDING_LIMIT)
+    ]
+    trending_groups = [
+        TrendingGroup(group_id=group_id, score=score)
+        for group_id, score in decayed_counts(
+            posts.iterator(), now
+        ).most_common(settings.TRENDING_LIMIT)
+    ]
+    with transaction.atomic():
+        TrendingPost.objects.all().delete()
+        TrendingPost.objects.bulk_create(trending_posts)
+        TrendingGroup.objects.all().delete()
+        TrendingGroup.objects.bulk_create(trending_groups)
+    return len(trending_posts), len(trending_groups)
@@ -1,9 +1,19 @@
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.http import Http404, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.template.loader import render_to_string
+from django.views.decorators.http import require_POST
 
-from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
-from .page_separation import get_page_obj
+from core.ratelimit import ratelimit
+from . import comment_buffer, follow_graph
+from .forms import BulkFollowForm, CommentForm, PostForm
+from .models import (
+    ArchivedPost, Follow, FollowSuggestion, Group, Post, TrendingGroup,
+    TrendingPost, User
+)
+from .page_separation import get_cursor_page, get_page_obj
+from .tasks import generate_thumbnail
 
 
 def paginator(request, posts):
@@ -12,6 +22,33 @@ def paginator(request, posts):
     return page_obj
 
 
+def follow_counters(author):
+    return {
+        'followers_count': len(follow_graph.follower_ids(author.id)),
+        'following_count': len(follow_graph.following_ids(author.id)),
+    }
+
+
+def get_post_or_archived(post_id):
+    """Пост из горячей таблицы, а если его там нет — из архива."""
+    post = Post.objects.select_related('author', 'group').filter(
+        pk=post_id
+    ).first() or ArchivedPost.objects.select_related(
+        'author', 'group'
+    ).filter(pk=post_id).first()
+    if post is None:
+        raise Http404
+    return post
+
+
+def comments_page(request, post):
+    return get_cursor_page(
+        post.comments.select_related('author'),
+        request.GET.get('before'),
+        settings.COMMENTS_LIMIT,
+    )
+
+
 def index(request):
     posts = Post.objects.select_related(
         'author',
@@ -19,6 +56,22 @@ def index(request):
     )
     template = 'posts/index.html'
     page_obj = paginator(request, posts)
+    context = {
+        'page_obj': page_obj,
+        'trending_posts': TrendingPost.objects.select_related(
+            'post__author'
+        ),
+        'trending_groups': TrendingGroup.objects.select_related('group'),
+    }
+    return render(request, template, context)
+
+
+def discussed(request):
+    posts = Post.objects.filter(
+        last_comment_at__isnull=False
+    ).order_by('-last_comment_at').select_related('author', 'group')
+    template = 'posts/discussed.html'
+    page_obj = paginator(request, posts)
     context = {
         'page_obj': page_obj,
     }
@@ -44,40 +97,44 @@ def profile(request, username):
     template = 'posts/profile.html'
     following = (
         request.user.is_authenticated
-        and Follow.objects.filter(
-            user=request.user,
-            author=author
-        ).exists())
+        and follow_graph.is_following(request.user.id, author.id))
     context = {
         'author': author,
         'page_obj': page_obj,
         'following': following,
+        'posts_count': page_obj.paginator.count,
+        **follow_counters(author),
     }
     return render(request, template, context)
 
 
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_post_or_archived(post_id)
     template = 'posts/post_detail.html'
-    comments = post.comments.all()
+    comments, next_cursor = comments_page(request, post)
     form = CommentForm()
     following = (
         request.user.is_authenticated
-        and Follow.objects.filter(
-            user=request.user,
-            author=post.author
-        ).exists())
+        and follow_graph.is_following(request.user.id, post.author_id))
+    pending = []
+    if request.user.is_authenticated and isinstance(post, Post):
+        pending = comment_buffer.pending_for(request, post)
     context = {
         'post': post,
         'form': form,
         'comments': comments,
+        'pending_comments': pending,
+        'next_cursor': next_cursor,
         'following': following,
         'author': post.author,
+        'posts_count': post.author.posts.count(),
+        **follow_counters(post.author),
     }
     return render(request, template, context)
 
 
 @login_required
+@ratelimit('post_create')
 def post_create(request):
     template = 'posts/create_post.html'
     form = PostForm(request.POST or None)
@@ -100,7 +157,9 @@ def post_edit(request, post_id):
         files=request.FILES or None,
         instance=post)
     if form.is_valid():
-        form.save()
+        post = form.save()
+        if post.image:
+            generate_thumbnail.delay(post.pk)
         return redirect('posts:post_detail', post_id=post.pk)
     context = {
         'form': form,
@@ -110,27 +169,67 @@ def post_edit(request, post_id):
     return render(request, template, context)
 
 
+def comments_fragment(request, post_id):
+    post = get_post_or_archived(post_id)
+    comments, next_cursor = comments_page(request, post)
+    html = render_to_string(
+        'posts/includes/comments.html', {'comments': comments}, request
+    )
+    return JsonResponse({'html': html, 'next': next_cursor})
+
+
 @login_required
+@ratelimit('add_comment')
 def add_comment(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
     form = CommentForm(request.POST or None)
     template = 'posts:post_detail'
     if form.is_valid():
-        comment = form.save(commit=False)
-        comment.author = request.user
-        comment.post = post
-        comment.save()
+        if settings.COMMENT_BUFFER_ENABLED:
+            comment = comment_buffer.enqueue(
+                post, request.user, form.cleaned_data['text']
+            )
+            comment_buffer.remember(request, comment)
+        else:
+            comment = form.save(commit=False)
+            comment.author = request.user
+            comment.post = post
+            comment.save()
+        if request.is_ajax():
+            html = render_to_string(
+                'posts/includes/comment.html',
+                {'comment': comment, 'pending': comment.pk is None},
+                request
+            )
+            return JsonResponse(
+                {'html': html}, status=201 if comment.pk else 202
+            )
+    elif request.is_ajax():
+        return JsonResponse({'errors': form.errors}, status=400)
     return redirect(template, post_id=post_id)
 
 
 @login_required
 def follow_index(request):
-    username = request.user
-    posts = Post.objects.filter(author__following__user=username)
+    author_ids = follow_graph.following_ids(request.user.id)
+    if len(author_ids) <= settings.FOLLOW_IN_LIMIT:
+        posts = Post.objects.filter(author_id__in=author_ids)
+    else:
+        posts = Post.objects.filter(author__following__user=request.user)
+    posts = posts.select_related('author', 'group')
     page_obj = paginator(request, posts)
+    suggestions = FollowSuggestion.objects.filter(
+        user=request.user
+    ).select_related('author')[:settings.SUGGESTIONS_LIMIT]
     template = 'posts/follow.html'
     context = {
         'page_obj': page_obj,
+        'suggestions': [
+            suggestion.author for suggestion in suggestions
+            if not follow_graph.is_following(
+                request.user.id, suggestion.author_id
+            )
+        ],
     }
     return render(request, template, context)
 
@@ -151,3 +250,20 @@ def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
     Follow.objects.filter(user=request.user, author=author).delete()
     return redirect('posts:profile', username=username)
+
+
+@login_required
+@require_POST
+def bulk_follow(request):
+    form = BulkFollowForm(request.POST)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+    if form.cleaned_data['unfollow']:
+        count, missing = follow_graph.bulk_unfollow(
+            request.user, form.cleaned_data['usernames']
+        )
+        return JsonResponse({'unfollowed': count, 'missing': missing})
+    count, missing = follow_graph.bulk_follow(
+        request.user, form.cleaned_data['usernames']
+    )
+    return JsonResponse({'followed': count, 'missing': missing})
@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+
+from core.models import Task
+from .models import QueuedEmail
+from .tasks import flush_emails
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    """Складывает письма в очередь; отправляет их воркер пачками.
+    Письма, которые очередь не хранит, уходят сразу через
+    EMAIL_DELIVERY_BACKEND."""
+
+    def send_messages(self, email_messages):
+        direct = [
+            message for message in email_messages
+            if not QueuedEmail.can_queue(message)
+        ]
+        sent = 0
+        if direct:
+            sent = get_connection(
+                settings.EMAIL_DELIVERY_BACKEND,
+                fail_silently=self.fail_silently,
+            ).send_messages(direct) or 0
+        emails = [
+            QueuedEmail.from_message(message) for message in email_messages
+            if QueuedEmail.can_queue(message)
+        ]
+        if not emails:
+            return sent
+        QueuedEmail.objects.bulk_create(emails)
+        flush_name = f'{flush_emails.__module__}.{flush_emails.__name__}'
+        if not Task.objects.filter(
+            name=flush_name, status=Task.PENDING
+        ).exists():
+            flush_emails.delay()
+        return sent + len(emails)
@@ -0,0 +1,28 @@
+# Generated by Django 2.2.16 on 2026-10-19 10:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='queuedemail',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Взято воркером'),
+        ),
+        migrations.AddField(
+            model_name='queuedemail',
+            name='headers',
+            field=models.TextField(blank=True, verbose_name='Дополнительные заголовки'),
+        ),
+        migrations.AddField(
+            model_name='queuedemail',
+            name='reply_to',
+            field=models.TextField(blank=True, verbose_name='Ответить'),
+        ),
+    ]
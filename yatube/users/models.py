@@ -0,0 +1,116 @@
+import json
+
+from django.core.mail import EmailMultiAlternatives
+from django.db import models
+
+
+class QueuedEmail(models.Model):
+    """Письмо, ожидающее пакетной отправки воркером."""
+    subject = models.CharField(
+        max_length=255,
+        verbose_name='Тема'
+    )
+    body = models.TextField(verbose_name='Текст')
+    html = models.TextField(
+        blank=True,
+        verbose_name='HTML-версия'
+    )
+    from_email = models.CharField(
+        max_length=254,
+        verbose_name='Отправитель'
+    )
+    to = models.TextField(verbose_name='Получатели')
+    cc = models.TextField(
+        blank=True,
+        verbose_name='Копия'
+    )
+    bcc = models.TextField(
+        blank=True,
+        verbose_name='Скрытая копия'
+    )
+    reply_to = models.TextField(
+        blank=True,
+        verbose_name='Ответить'
+    )
+    headers = models.TextField(
+        blank=True,
+        verbose_name='Дополнительные заголовки'
+    )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Поставлено в очередь'
+    )
+    claimed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Взято воркером'
+    )
+    sent_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Отправлено'
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['created'],
+                name='queued_email_unsent_idx',
+                condition=models.Q(sent_at__isnull=True),
+            ),
+        ]
+        ordering = ('created',)
+        verbose_name = 'Письмо в очереди'
+        verbose_name_plural = 'Письма в очереди'
+
+    def __str__(self):
+        return f'{self.subject} → {self.to}'
+
+    @staticmethod
+    def can_queue(message):
+        """Вложения и альтернативы, кроме одной HTML-версии, в очереди
+        не хранятся — такие письма отправляются сразу."""
+        alternatives = getattr(message, 'alternatives', ())
+        return (
+            not message.attachments
+            and message.content_subtype == 'plain'
+            and len(alternatives) <= 1
+            and all(mimetype == 'text/html' for _, mimetype in alternatives)
+        )
+
+    @classmethod
+    def from_message(cls, message):
+        html = next(
+            (content for content, mimetype
+             in getattr(message, 'alternatives', ())
+             if mimetype == 'text/html'),
+            ''
+        )
+        return cls(
+            subject=message.subject,
+            body=message.body,
+            html=html,
+            from_email=message.from_email,
+            to='\n'.join(message.to),
+            cc='\n'.join(message.cc),
+            bcc='\n'.join(message.bcc),
+            reply_to='\n'.join(message.reply_to),
+            headers=json.dumps(message.extra_headers)
+            if message.extra_headers else '',
+        )
+
+    def to_message(self, connection=None):
+        message = EmailMultiAlternatives(
+            subject=self.subject,
+            body=self.body,
+            from_email=self.from_email,
+            to=self.to.split('\n') if self.to else None,
+            cc=self.cc.split('\n') if self.cc else None,
+            bcc=self.bcc.split('\n') if self.bcc else None,
+            reply_to=self.reply_to.split('\n') if self.reply_to else None,
+            headers=json.loads(self.headers) if self.headers else None,
+            connection=connection,
+        )
+        if self.html:
+            message.attach_alternative(self.html, 'text/html')
+        return message
@@ -0,0 +1,59 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.db.models import Q
+from django.utils import timezone
+
+from core.tasks import task
+from .models import QueuedEmail
+
+
+def claim_batch():
+    """Берёт пачку неотправленных писем в аренду до TASK_TIMEOUT.
+
+    Условие по claimed_at в UPDATE не даёт двум воркерам взять одно
+    письмо; аренда упавшего воркера истекает вместе с его задачей,
+    и письма достаются повтору из requeue_stale.
+    """
+    now = timezone.now()
+    free = Q(sent_at__isnull=True) & (
+        Q(claimed_at__isnull=True)
+        | Q(claimed_at__lt=now - timedelta(seconds=settings.TASK_TIMEOUT))
+    )
+    pks = QueuedEmail.objects.filter(free).values_list(
+        'pk', flat=True
+    )[:settings.EMAIL_BATCH_SIZE]
+    claimed = [
+        pk for pk in list(pks)
+        if QueuedEmail.objects.filter(free, pk=pk).update(claimed_at=now)
+    ]
+    return QueuedEmail.objects.filter(pk__in=claimed)
+
+
+@task
+def flush_emails():
+    """Отправляет очередь писем пачками через одно соединение.
+
+    sent_at ставится каждому письму после его отправки, поэтому при
+    сбое на середине пачки уже ушедшие письма не повторяются, а с
+    остальных снимается аренда для повтора задачи.
+    """
+    sent = 0
+    with get_connection(settings.EMAIL_DELIVERY_BACKEND) as connection:
+        while True:
+            batch = list(claim_batch())
+            if not batch:
+                return sent
+            for position, email in enumerate(batch):
+                try:
+                    connection.send_messages([email.to_message(connection)])
+                except Exception:
+                    QueuedEmail.objects.filter(
+                        pk__in=[rest.pk for rest in batch[position:]]
+                    ).update(claimed_at=None)
+                    raise
+                QueuedEmail.objects.filter(pk=email.pk).update(
+                    sent_at=timezone.now()
+                )
+                sent += 1
@@ -1,17 +1,34 @@
+from datetime import timedelta
 from http import HTTPStatus
 
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.core import mail
+from django.core.mail import EmailMessage
+from django.core.mail.backends.locmem import EmailBackend
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
+
+from core.tasks import run_pending
+from .models import QueuedEmail
+from .tasks import flush_emails
 
 User = get_user_model()
 
 
+class FlakyEmailBackend(EmailBackend):
+    """locmem, который не может доставить письмо на broken@ya.ru."""
+
+    def send_messages(self, messages):
+        if any('broken@ya.ru' in message.to for message in messages):
+            raise ConnectionError('SMTP недоступен')
+        return super().send_messages(messages)
+
+
 class UserURLTests(TestCase):
 
     @classmethod
-    def setUpClass(cls):
-        super().setUpClass()
+    def setUpTestData(cls):
         cls.user = User.objects.create_user(username='test_user')
         cls.uid = 'test-uid'
         cls.token = 'test-token'
@@ -86,3 +103,109 @@ class UserURLTests(TestCase):
             with self.subTest(adress=adress):
                 response = self.authorized_user.get(adress)
                 self.assertTemplateUsed(response, template)
+
+
+@override_settings(
+    EMAIL_BACKEND='users.mail.QueuedEmailBackend',
+    EMAIL_DELIVERY_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    EMAIL_BATCH_SIZE=2,
+)
+class QueuedEmailTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        for number in range(3):
+            User.objects.create_user(
+                username=f'reader{number}', email=f'reader{number}@ya.ru',
+                password='secret-pass'
+            )
+
+    def reset_password(self, email):
+        return self.client.post(
+            reverse('users:password_reset_form'), {'email': email}
+        )
+
+    def test_reset_email_is_queued(self):
+        """Сброс пароля не отправляет письмо в запросе, а ставит в очередь."""
+        response = self.reset_password('reader0@ya.ru')
+        self.assertRedirects(response, reverse('users:password_reset_done'))
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(QueuedEmail.objects.count(), 1)
+
+    def test_worker_sends_queue_in_batches(self):
+        """Воркер отправляет все письма пачками по одной задаче."""
+        for number in range(3):
+            self.reset_password(f'reader{number}@ya.ru')
+        run_pending(10)
+        self.assertEqual(
+            sorted(message.to[0] for message in mail.outbox),
+            [f'reader{number}@ya.ru' for number in range(3)]
+        )
+        self.assertFalse(
+            QueuedEmail.objects.filter(sent_at__isnull=True).exists()
+        )
+        run_pending(10)
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_partial_failure_keeps_delivered_emails(self):
+        """Сбой на середине пачки не повторяет уже отправленные письма."""
+        for address in ('first@ya.ru', 'broken@ya.ru', 'last@ya.ru'):
+            EmailMessage('Тема', 'Текст', to=[address]).send()
+        with override_settings(
+            EMAIL_DELIVERY_BACKEND='users.test.FlakyEmailBackend'
+        ), self.assertRaises(ConnectionError):
+            flush_emails()
+        self.assertEqual(
+            [message.to for message in mail.outbox], [['first@ya.ru']]
+        )
+        self.assertEqual(
+            list(QueuedEmail.objects.filter(
+                sent_at__isnull=True, claimed_at__isnull=True
+            ).values_list('to', flat=True)),
+            ['broken@ya.ru', 'last@ya.ru']
+        )
+        QueuedEmail.objects.filter(to='broken@ya.ru').update(to='fixed@ya.ru')
+        flush_emails()
+        self.assertEqual(
+            [message.to[0] for message in mail.outbox],
+            ['first@ya.ru', 'fixed@ya.ru', 'last@ya.ru']
+        )
+
+    def test_crashed_worker_lease_expires(self):
+        """Письма упавшего воркера остаются неотправленными и
+        достаются повтору после истечения аренды."""
+        EmailMessage('Тема', 'Текст', to=['reader0@ya.ru']).send()
+        QueuedEmail.objects.update(claimed_at=timezone.now())
+        self.assertEqual(flush_emails(), 0)
+        QueuedEmail.objects.update(
+            claimed_at=timezone.now() - timedelta(hours=1)
+        )
+        self.assertEqual(flush_emails(), 1)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_reply_to_and_headers_are_kept(self):
+        """Reply-To и дополнительные заголовки переживают очередь."""
+        EmailMessage(
+            'Тема', 'Текст', to=['reader0@ya.ru'],
+            reply_to=['support@ya.ru'], headers={'X-Campaign': 'reset'}
+        ).send()
+        flush_emails()
+        message = mail.outbox[0]
+        self.assertEqual(message.reply_to, ['support@ya.ru'])
+        self.assertEqual(message.extra_headers, {'X-Campaign': 'reset'})
+
+    def test_bcc_only_message(self):
+        """Письмо только со скрытыми получателями уходит без пустого To."""
+        EmailMessage('Тема', 'Текст', bcc=['reader0@ya.ru']).send()
+        flush_emails()
+        message = mail.outbox[0]
+        self.assertEqual(message.to, [])
+        self.assertEqual(message.recipients(), ['reader0@ya.ru'])
+
+    def test_attachments_are_sent_directly(self):
+        """Письмо с вложением не ставится в очередь, а уходит сразу."""
+        message = EmailMessage('Тема', 'Текст', to=['reader0@ya.ru'])
+        message.attach('report.txt', 'отчёт', 'text/plain')
+        message.send()
+        self.assertFalse(QueuedEmail.objects.exists())
+        self.assertEqual(mail.outbox[0].attachments[0][0], 'report.txt')
@@ -51,6 +51,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.CompressionMiddleware',
+    'core.middleware.HtmlMinifyMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -131,9 +133,13 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static'),)
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+if not DEBUG:
+    STATICFILES_STORAGE = 'core.storage.CompressedManifestStaticFilesStorage'
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+EMAIL_BACKEND = 'users.mail.QueuedEmailBackend'
+EMAIL_DELIVERY_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
@@ -143,9 +149,47 @@ CACHES = {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
 
 LIMIT: int = 10
 POST_SYMBOLS: int = 25
 TEST_POST: int = 15
 POST_NUMBER: int = 3
 ZERO_VALUE: int = 0
+TEXT_CACHE_TIMEOUT: int = 60 * 60 * 24
+TEXT_CACHE_MIN_LENGTH: int = 500
+FOLLOW_GRAPH_TIMEOUT: int = 60 * 5
+FOLLOW_IN_LIMIT: int = 500
+SUGGESTIONS_LIMIT: int = 5
+BULK_BATCH_SIZE: int = 500
+BULK_FOLLOW_LIMIT: int = 1000
+COMMENTS_LIMIT: int = 20
+TASK_WORKERS: int = 4
+TASK_MAX_ATTEMPTS: int = 3
+TASK_RETRY_DELAY: int = 30
+TASK_POLL_INTERVAL: int = 1
+TASK_TIMEOUT: int = 60 * 10
+EMAIL_BATCH_SIZE: int = 100
+TRENDING_WINDOW: int = 48
+TRENDING_HALF_LIFE: int = 6
+TRENDING_LIMIT: int = 5
+EXACT_COUNT_LIMIT: int = 10000
+MODERATION_SYNC_LIMIT: int = 1000
+ARCHIVE_AFTER_DAYS: int = 365
+RATELIMIT_ENABLED: bool = True
+# (запросов, секунд окна). Общий для всех воркеров лимит требует общего
+# кеша (memcached, redis): LocMemCache считает запросы в каждом процессе.
+RATELIMITS: dict = {
+    'post_create': {'user': (5, 60), 'ip': (30, 60)},
+    'add_comment': {'user': (10, 60), 'ip': (60, 60)},
+    'signup': {'ip': (5, 60 * 60)},
+}
+COMMENT_BUFFER_ENABLED: bool = False
+COMMENT_BUFFER_DIR: str = os.path.join(BASE_DIR, 'comment_buffer')
+COMMENT_BUFFER_SIZE: int = 50
+COMMENT_BUFFER_MAX_DELAY: int = 2
+# fsync каждой строки журнала: без него комментарии, ещё не записанные
+# в базу, теряются при отключении питания (но не при падении процесса).
+COMMENT_BUFFER_FSYNC: bool = False
+STATIC_MAX_AGE: int = 60 * 60 * 24 * 365
@@ -0,0 +1,8 @@
+"""Настройки для тестов:
+python manage.py test --settings=yatube.test_settings"""
+from .settings import *  # noqa: F401,F403
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+DEFAULT_FILE_STORAGE = 'core.storage.InMemoryStorage'
+THUMBNAIL_DUMMY = True
+RATELIMIT_ENABLED = False